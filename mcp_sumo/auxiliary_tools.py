@@ -1232,8 +1232,9 @@ async def compare_simulation_results(
             ctx.error("Error: At least one tripinfo file is required")
         return {"success": False, "message": "Error: At least one tripinfo file is required"}
     
-    # Verify all files exist
+    # Verify all files exist, collecting the per-file lookup messages into one debug call
     missing_files = []
+    debug_messages = []
     for f in tripinfo_files:
         if not os.path.exists(f):
             # Try different path formats
@@ -1250,15 +1251,16 @@ async def compare_simulation_results(
                     # Update to valid path
                     tripinfo_files[tripinfo_files.index(f)] = alt_path
                     found = True
-                    if ctx:
-                        ctx.debug(f"Found alternative path: {alt_path}")
+                    debug_messages.append(f"Found alternative path: {alt_path}")
                     break
             
             if not found:
                 missing_files.append(f)
-                if ctx:
-                    ctx.debug(f"File does not exist: {f}")
-                    ctx.debug(f"None of the alternative paths exist")
+                debug_messages.append(f"File does not exist: {f}")
+                debug_messages.append(f"None of the alternative paths exist")
+    
+    if ctx and debug_messages:
+        ctx.debug("\n".join(debug_messages))
     
     if missing_files:
         if ctx:
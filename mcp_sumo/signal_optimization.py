@@ -1,3 +1,5 @@
+import asyncio
+import functools
 import os
 os.environ["SUMO_HOME"] = "D:\Program Files\SUMO"
 from fastmcp import FastMCP, Context
@@ -9,12 +11,25 @@ plt.rcParams['font.sans-serif'] = ['SimHei']
 import numpy as np
 from datetime import datetime
 import csv
+from collections import defaultdict
 
 # ────────────────────────────────────────────────────────────────────────────────
 # Initialize FastMCP
 # ────────────────────────────────────────────────────────────────────────────────
 mcp = FastMCP(name = "signal_optimization")
 
+# Approach directions recognised in CSV phase names
+DIRECTIONS = ("North", "South", "East", "West")
+
+# Direction of an entry lane by heading bucket: [315, 45), [45, 135), [135, 225), [225, 315)
+ANGLE_DIRECTIONS = ("West", "South", "East", "North")
+
+# Byte translation table turning green signal states into yellow ones
+GREEN_TO_YELLOW = bytes.maketrans(b'G', b'y')
+
+# Write buffer for generated XML files
+OUTPUT_BUFFER_SIZE = 1 << 20
+
 @mcp.prompt()
 def get_signal_optimization_guidance() -> str:
     """
@@ -694,12 +709,12 @@ def tls_to_csv(tls_file: str, net_file: str, output_file: str = None, ctx: Conte
         if not tl_logics:
             tl_logics = root.findall("./tlLogic")
         
+        # Processed intersections are reported in one message after the loop
+        processed_ids = []
         for tl_logic in tl_logics:
             junction_id = tl_logic.get("id")
             offset = tl_logic.get("offset", "0")
-            
-            if ctx:
-                ctx.info(f"Processing intersection: {junction_id}")
+            processed_ids.append(junction_id)
             
             # Get phase information for this traffic light
             phases_info = analyze_traffic_light_phases(net_file, tls_file, junction_id)
@@ -730,6 +745,9 @@ def tls_to_csv(tls_file: str, net_file: str, output_file: str = None, ctx: Conte
                         ])
                         phase_count += 1
         
+        if ctx and processed_ids:
+            ctx.info(f"Processed intersections: {', '.join(processed_ids)}")
+        
         # Set default output filename
         if output_file is None:
             output_dir = os.path.dirname(tls_file)
@@ -763,8 +781,16 @@ def tls_to_csv(tls_file: str, net_file: str, output_file: str = None, ctx: Conte
             "traceback": traceback.format_exc()
         }
 
+@functools.lru_cache(maxsize=8)
+def _load_net(net_path: str, mtime: float):
+    """
+    Load a SUMO network, cached per absolute path and modification time
+    """
+    import sumolib
+    return sumolib.net.readNet(net_path)
+
 @mcp.tool()
-def csv_to_tls(csv_file: str, net_file: str, output_file: str = None, ctx: Context = None) -> Dict[str, Any]:
+async def csv_to_tls(csv_file: str, net_file: str, output_file: str = None, ctx: Context = None) -> Dict[str, Any]:
     """
     Generate tls file from CSV format signal timing
     
@@ -776,58 +802,49 @@ def csv_to_tls(csv_file: str, net_file: str, output_file: str = None, ctx: Conte
     Returns:
         Dictionary containing tls file path and status information
     """
+    # Network loading and XML generation are CPU bound, keep the event loop free for other clients
+    return await asyncio.to_thread(_csv_to_tls, csv_file, net_file, output_file, ctx)
+
+def _csv_to_tls(csv_file: str, net_file: str, output_file: str = None, ctx: Context = None) -> Dict[str, Any]:
+    """
+    Blocking implementation of csv_to_tls, run in a worker thread
+    """
     import os
-    import csv
-    import xml.dom.minidom as minidom
     import xml.etree.ElementTree as ET
-    import sumolib
     
     if ctx:
         ctx.info(f"Starting signal timing generation from CSV file: {csv_file}")
     
-    # Check if files exist
-    if not os.path.exists(csv_file):
-        if ctx:
-            ctx.error(f"CSV file does not exist: {csv_file}")
-        return {"success": False, "message": f"CSV file does not exist: {csv_file}"}
-    
-    if not os.path.exists(net_file):
-        if ctx:
-            ctx.error(f"Network file does not exist: {net_file}")
-        return {"success": False, "message": f"Network file does not exist: {net_file}"}
-    
     try:
-        # Read CSV file
-        csv_data = []
-        with open(csv_file, 'r', encoding='utf-8') as f:
-            reader = csv.reader(f)
-            header = next(reader)  # Skip header
-            for row in reader:
-                csv_data.append(row)
+        # Read CSV file, missing files are reported by open() itself
+        try:
+            with open(csv_file, 'r', encoding='utf-8', newline='') as f:
+                reader = csv.reader(f)
+                next(reader, None)  # Skip header
+                # Blank or short lines are common in hand-edited timing files, skip them
+                rows = [row[:6] for row in reader if len(row) >= 6]
+        except FileNotFoundError:
+            if ctx:
+                ctx.error(f"CSV file does not exist: {csv_file}")
+            return {"success": False, "message": f"CSV file does not exist: {csv_file}"}
         
         if ctx:
-            ctx.info(f"Successfully read CSV file, {len(csv_data)} rows of data")
-        
-        # Group by intersection ID
-        junctions = {}
-        for row in csv_data:
-            if len(row) < 6:
-                continue
-                
-            junction_id = row[0]
-            phase_name = row[1]
-            green = int(row[2])
-            yellow = int(row[3])
-            red = int(row[4])
-            offset = int(row[5])
+            ctx.info(f"Successfully read CSV file, {len(rows)} rows of data")
+        
+        # Convert green, yellow, red and offset columns in a single pass
+        table = np.array(rows, dtype=str).reshape(len(rows), 6)
+        timings = table[:, 2:6].astype(np.int64).tolist()
+        
+        # Group by intersection ID, the offset is taken from the first row of each junction
+        junctions = defaultdict(lambda: {"phases": [], "offset": 0})
+        for junction_id, phase_name, (green, yellow, red, offset) in zip(
+            table[:, 0].tolist(), table[:, 1].tolist(), timings
+        ):
+            junction = junctions[junction_id]
+            if not junction["phases"]:
+                junction["offset"] = offset
             
-            if junction_id not in junctions:
-                junctions[junction_id] = {
-                    "phases": [],
-                    "offset": offset
-                }
-            
-            junctions[junction_id]["phases"].append({
+            junction["phases"].append({
                 "name": phase_name,
                 "green": green,
                 "yellow": yellow,
@@ -837,117 +854,24 @@ def csv_to_tls(csv_file: str, net_file: str, output_file: str = None, ctx: Conte
         # Load network using sumolib
         if ctx:
             ctx.info(f"Loading network file: {net_file}")
-        net = sumolib.net.readNet(net_file)
-        
-        # Create tls XML file
-        root = ET.Element("additional")
+        try:
+            net = _load_net(os.path.abspath(net_file), os.path.getmtime(net_file))
+        except FileNotFoundError:
+            if ctx:
+                ctx.error(f"Network file does not exist: {net_file}")
+            return {"success": False, "message": f"Network file does not exist: {net_file}"}
         
         # Create TLS ID to object mapping
-        tls_dict = {}
-        for tls in net._tlss:
-            tls_dict[tls._id] = tls
-            if ctx:
-                ctx.info(f"Found traffic light: {tls._id}")
+        tls_dict = {tls._id: tls for tls in net._tlss}
+        if ctx:
+            ctx.info(f"Found {len(tls_dict)} traffic lights")
         
-        for junction_id, junction_data in junctions.items():
-            if ctx:
-                ctx.info(f"Processing intersection: {junction_id}")
-            
-            # Try to get traffic light object
-            if junction_id not in tls_dict:
-                if ctx:
-                    ctx.warning(f"Could not find traffic light information for intersection {junction_id} in the network")
-                continue
-            
-            # Get traffic light object
-            tls = tls_dict[junction_id]
-            connections = tls.getConnections()
-            num_links = len(connections)
-            
-            if ctx:
-                ctx.info(f"Intersection {junction_id} has {num_links} connections")
-            
-            if num_links == 0:
-                if ctx:
-                    ctx.warning(f"Intersection {junction_id} has no controlled connections")
-                continue
-            
-            # Create traffic light logic element
-            tl_logic = ET.SubElement(root, "tlLogic")
-            tl_logic.set("id", junction_id)
-            tl_logic.set("type", "static")
-            tl_logic.set("programID", "generated")
-            tl_logic.set("offset", str(junction_data["offset"]))
-            
-            # Build direction to connection index mapping
-            direction_map = {}
-            
-            # Traverse all connections, determine direction based on entry lane position
-            for idx, conn in enumerate(connections):
-                try:
-                    inLane, outLane, linkIndex = conn
-                    
-                    # Get entry lane shape
-                    lane_shape = inLane.getShape()
-                    if len(lane_shape) < 2:
-                        if ctx:
-                            ctx.warning(f"Entry lane shape insufficient for connection {idx}")
-                        continue
-                    
-                    # Calculate lane angle
-                    p1, p2 = lane_shape[-2], lane_shape[-1]
-                    import math
-                    angle_rad = math.atan2(p2[1] - p1[1], p2[0] - p1[0])
-                    angle_deg = (math.degrees(angle_rad) + 360) % 360
-                    
-                    # Map angle to direction
-                    if 45 <= angle_deg < 135:
-                        direction = "South"
-                    elif 135 <= angle_deg < 225:
-                        direction = "East"
-                    elif 225 <= angle_deg < 315:
-                        direction = "North"
-                    else:
-                        direction = "West"
-                    
-                    # Add to mapping
-                    if direction not in direction_map:
-                        direction_map[direction] = []
-                    direction_map[direction].append(linkIndex)
-                except Exception as e:
-                    if ctx:
-                        ctx.error(f"Error processing connection {idx}: {str(e)}")
-            
-            # Create green and yellow phases for each phase
-            for phase_data in junction_data["phases"]:
-                # Get phase name
-                phase_name = phase_data["name"]
-                
-                # Create default all-red state
-                state_list = ['r'] * num_links
-                
-                # Set signal state for corresponding directions based on phase name
-                for direction in ["North", "South", "East", "West"]:
-                    if direction in phase_name and direction in direction_map:
-                        for idx in direction_map[direction]:
-                            if idx < len(state_list):
-                                state_list[idx] = 'G'
-                
-                # Create green phase
-                green_phase = ET.SubElement(tl_logic, "phase")
-                green_phase.set("duration", str(phase_data["green"]))
-                green_phase.set("state", "".join(state_list))
-                
-                # If yellow time exists, create yellow phase
-                if phase_data["yellow"] > 0:
-                    yellow_list = state_list.copy()
-                    for i, s in enumerate(yellow_list):
-                        if s == 'G':
-                            yellow_list[i] = 'y'
-                    
-                    yellow_phase = ET.SubElement(tl_logic, "phase")
-                    yellow_phase.set("duration", str(phase_data["yellow"]))
-                    yellow_phase.set("state", "".join(yellow_list))
+        # Per-junction progress is summarized once at the end, and per-junction
+        # warnings and errors are collected and sent as one message per level
+        generated_count = 0
+        link_count = 0
+        warning_messages = []
+        error_messages = []
         
         # Set default output filename
         if output_file is None:
@@ -957,17 +881,120 @@ def csv_to_tls(csv_file: str, net_file: str, output_file: str = None, ctx: Conte
         # Ensure output directory exists
         os.makedirs(os.path.dirname(output_file), exist_ok=True)
         
-        # Prettify XML and save
-        xml_str = ET.tostring(root, encoding='utf-8')
-        dom = minidom.parseString(xml_str)
-        pretty_xml = dom.toprettyxml(indent="    ")
-        
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(pretty_xml)
+        # Stream one tlLogic element per junction so the full document is never held in memory
+        # Write to a temporary file first so a failure never leaves a partial output_file
+        tmp_file = f"{output_file}.tmp"
+        try:
+            with open(tmp_file, 'wb', buffering=OUTPUT_BUFFER_SIZE) as f:
+                f.write(b"<?xml version='1.0' encoding='utf-8'?>\n<additional>\n")
+                
+                for junction_id, junction_data in junctions.items():
+                    # Try to get traffic light object
+                    if junction_id not in tls_dict:
+                        warning_messages.append(f"Could not find traffic light information for intersection {junction_id} in the network")
+                        continue
+                    
+                    # Get traffic light object
+                    tls = tls_dict[junction_id]
+                    connections = tuple(tls.getConnections())
+                    num_links = len(connections)
+                    
+                    if num_links == 0:
+                        warning_messages.append(f"Intersection {junction_id} has no controlled connections")
+                        continue
+                    
+                    # Create traffic light logic element
+                    tl_logic = ET.Element("tlLogic", {
+                        "id": junction_id,
+                        "type": "static",
+                        "programID": "generated",
+                        "offset": str(junction_data["offset"])
+                    })
+                    generated_count += 1
+                    link_count += num_links
+                    
+                    # Split connections into parallel entry lane / link index sequences
+                    in_lanes, out_lanes, link_indices = zip(*connections)
+                    link_indices = np.fromiter(link_indices, dtype=np.intp, count=num_links)
+                    
+                    # Build direction to connection position mapping
+                    direction_map = defaultdict(list)
+                    
+                    # Traverse all connections, determine direction based on entry lane position
+                    for idx, inLane in enumerate(in_lanes):
+                        try:
+                            # Get entry lane shape
+                            lane_shape = inLane.getShape()
+                            if len(lane_shape) < 2:
+                                warning_messages.append(f"Entry lane shape insufficient for connection {idx} of intersection {junction_id}")
+                                continue
+                            
+                            # Calculate lane angle
+                            p1, p2 = lane_shape[-2], lane_shape[-1]
+                            import math
+                            angle_rad = math.atan2(p2[1] - p1[1], p2[0] - p1[0])
+                            angle_deg = (math.degrees(angle_rad) + 360) % 360
+                            
+                            # Map angle to direction by 90 degree bucket centred on each axis
+                            direction = ANGLE_DIRECTIONS[int((angle_deg + 45) // 90) % 4]
+                            
+                            # Add to mapping
+                            direction_map[direction].append(idx)
+                        except Exception as e:
+                            error_messages.append(f"Error processing connection {idx} of intersection {junction_id}: {str(e)}")
+                    
+                    # Resolve connection positions to link indices, dropping out-of-range entries
+                    for direction, positions in direction_map.items():
+                        indices = link_indices[positions]
+                        direction_map[direction] = indices[indices < num_links]
+                    
+                    # Mark the links controlled by each direction
+                    direction_masks = np.zeros((len(DIRECTIONS), num_links), dtype=np.uint8)
+                    for d, direction in enumerate(DIRECTIONS):
+                        if direction in direction_map:
+                            direction_masks[d, direction_map[direction]] = 1
+                    
+                    # Match phase names against directions, then build all green states at once
+                    phases = junction_data["phases"]
+                    membership = np.array(
+                        [[direction in phase["name"] for direction in DIRECTIONS] for phase in phases],
+                        dtype=np.uint8
+                    ).reshape(len(phases), len(DIRECTIONS))
+                    states = np.where(membership @ direction_masks > 0, ord('G'), ord('r')).astype(np.uint8)
+                    
+                    # Stringify durations once per junction, None marks phases without yellow time
+                    green_strs = [str(phase["green"]) for phase in phases]
+                    yellow_strs = [str(phase["yellow"]) if phase["yellow"] > 0 else None for phase in phases]
+                    
+                    # Create green and yellow phases for each phase
+                    for green_str, yellow_str, state in zip(green_strs, yellow_strs, states):
+                        state = state.tobytes()
+                        
+                        # Create green phase
+                        ET.SubElement(tl_logic, "phase", {"duration": green_str, "state": state.decode('ascii')})
+                        
+                        # If yellow time exists, create yellow phase
+                        if yellow_str is not None:
+                            yellow_state = state.translate(GREEN_TO_YELLOW)
+                            ET.SubElement(tl_logic, "phase", {"duration": yellow_str, "state": yellow_state.decode('ascii')})
+                    
+                    ET.indent(tl_logic, space="    ", level=1)
+                    f.writelines((b"    ", ET.tostring(tl_logic, encoding='utf-8'), b"\n"))
+                
+                f.write(b"</additional>\n")
+        except BaseException:
+            os.remove(tmp_file)
+            raise
+        os.replace(tmp_file, output_file)
         
         if ctx:
+            if warning_messages:
+                ctx.warning("\n".join(warning_messages))
+            if error_messages:
+                ctx.error("\n".join(error_messages))
             ctx.info(f"tls file generated successfully: {output_file}")
-            ctx.info(f"Processed {len(junctions)} intersections")
+            ctx.info(f"Processed {len(junctions)} intersections, "
+                     f"generated {generated_count} signal programs covering {link_count} connections")
         
         return {
             "success": True,
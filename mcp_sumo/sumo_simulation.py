@@ -1,12 +1,24 @@
 import asyncio
 import contextlib
+import csv
+import gzip
+import hashlib
 import io
+import json
 import logging
 import os
+import shutil
 import time
-os.environ["SUMO_HOME"] = "D:\Program Files\SUMO"
 import subprocess
+import sys
+import traceback
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Dict, List, Tuple
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
 
 import httpx
 import osmnx as ox
@@ -17,24 +29,451 @@ from tools.separate_light import separate_traffic_lights
 # Initialize FastMCP
 # ────────────────────────────────────────────────────────────────────────────────
 ox.settings.log_console = False
+ox.settings.use_cache = True
+ox.settings.cache_folder = os.path.join("data", "cache", "osmnx")
+# OSMnx work is GIL-bound graph building, so run it on one dedicated thread and queue the rest
+_OSMNX_EXEC = ThreadPoolExecutor(max_workers=1, thread_name_prefix="osmnx")
 mcp = FastMCP(name = "sumo_simulation")
 
 OVERPASS_API = "https://overpass.osm.jp/api/interpreter"
 
+# netconvert options applied to every OSM import
+NETCONVERT_OSM_OPTIONS = (
+    "--geometry.remove", "--roundabouts.guess", "--ramps.guess",
+    "--junctions.join", "--tls.guess-signals", "--tls.discard-simple",
+    "--tls.join", "--output.street-names"
+)
+
+# Bytes of a command log returned to the caller when a logged command fails
+LOG_TAIL_SIZE = 8192
+
+# Keep console windows from flashing up for each SUMO tool started on Windows
+SUBPROCESS_CREATIONFLAGS = subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
+
+# Optional road type map in the working directory, looked up once at startup
+TYPEMAP_FILE = "typemap.xml" if os.path.exists("typemap.xml") else None
+
+# SUMO installation, an existing SUMO_HOME environment variable takes precedence;
+# the default install path is only assumed on Windows
+if sys.platform == "win32":
+    os.environ.setdefault("SUMO_HOME", r"D:\Program Files\SUMO")
+SUMO_HOME = os.environ.get("SUMO_HOME", "")
+
+def _find_sumo_tool(script_name: str):
+    """Locate a SUMO tools script in SUMO_HOME, falling back to the bundled copy."""
+    candidates = [os.path.join(os.path.dirname(__file__), "tools", script_name)]
+    if SUMO_HOME:
+        candidates.insert(0, os.path.join(SUMO_HOME, "tools", script_name))
+    for candidate in candidates:
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+RANDOM_TRIPS_SCRIPT = _find_sumo_tool("randomTrips.py")
+WEBSTER_SCRIPT = _find_sumo_tool("tlsCycleAdaptation.py")
+GREENWAVE_SCRIPT = _find_sumo_tool("tlsCoordinator.py")
+
+# Comparison script shipped with this server, None if it is missing
+COMPARE_SCRIPT = os.path.join(os.path.dirname(__file__), "tools", "compare_and_draw.py")
+if not os.path.exists(COMPARE_SCRIPT):
+    COMPARE_SCRIPT = None
+
+# Road classes downloaded for simulation networks
+OSM_HIGHWAY_FILTER = '["highway"~"motorway|trunk|primary|secondary|tertiary"]'
+
+# Downloaded OSM files are kept gzipped here and reused for identical queries
+OVERPASS_CACHE_DIR = os.path.join("data", "cache", "overpass")
+OVERPASS_CACHE_TTL = 7 * 24 * 3600  # seconds
+
+# Configuration written by create_sumo_config, filled with %-style named placeholders
+SUMO_CONFIG_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<configuration xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:noNamespaceSchemaLocation="http://sumo.dlr.de/xsd/sumoConfiguration.xsd">
+    <input>
+        <net-file value="%(net_file)s"/>
+        <route-files value="%(route_files)s"/>
+        %(additional_files)s
+    </input>
+    <time>
+        <begin value="%(begin_time)s"/>
+        <end value="%(end_time)s"/>
+    </time>
+    <processing>
+        <ignore-route-errors value="true"/>
+    </processing>
+    <routing>
+        <device.rerouting.adaptation-steps value="18"/>
+        <device.rerouting.adaptation-interval value="10"/>
+    </routing>
+    <report>
+        <verbose value="true"/>
+        <duration-log.statistics value="true"/>
+        <no-step-log value="true"/>
+    </report>
+</configuration>
+"""
+
+# Configuration written by run_simulation for sumo-gui runs, filled like SUMO_CONFIG_TEMPLATE
+RUN_CONFIG_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<configuration xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:noNamespaceSchemaLocation="http://sumo.dlr.de/xsd/sumoConfiguration.xsd">
+    <input>
+        <net-file value="%(net_file)s"/>
+        <route-files value="%(route_files)s"/>
+        %(additional_files)s
+    </input>
+    <time>
+        <begin value="%(begin_time)s"/>
+        <end value="%(end_time)s"/>
+    </time>
+    <output>
+        <tripinfo-output value="%(tripinfo_file)s"/>
+    </output>
+    <processing>
+        <ignore-route-errors value="true"/>
+        <time-to-teleport value="300"/>
+        <collision.action value="warn"/>
+    </processing>
+    <report>
+        <verbose value="true"/>
+        <duration-log.statistics value="true"/>
+        <no-step-log value="true"/>
+    </report>
+</configuration>
+"""
+
 # ────────────────────────────────────────────────────────────────────────────────
-# Helper: Safely run external commands
+# Helper: On-disk cache of downloaded OSM files
+# ────────────────────────────────────────────────────────────────────────────────
+def _osm_cache_base(place_name: str, custom_filter: str, bbox) -> str:
+    """Cache path without extension for a download query."""
+    query = f"{place_name}|{custom_filter}|{tuple(bbox) if bbox is not None else ''}"
+    return os.path.join(OVERPASS_CACHE_DIR, hashlib.sha1(query.encode("utf-8")).hexdigest())
+
+def _load_cached_osm(cache_base: str, output_file: str):
+    """Restore a fresh cached .osm.gz download to output_file, returning (num_nodes, num_edges) or None."""
+    try:
+        if time.time() - os.path.getmtime(f"{cache_base}.osm.gz") > OVERPASS_CACHE_TTL:
+            return None
+        with open(f"{cache_base}.json", "r", encoding="utf-8") as f:
+            info = json.load(f)
+        _materialize(f"{cache_base}.osm.gz", output_file)
+        return info["num_nodes"], info["num_edges"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+def _store_cached_osm(cache_base: str, osm_file: str, num_nodes: int, num_edges: int) -> None:
+    """Add a downloaded .osm.gz file to the cache."""
+    os.makedirs(OVERPASS_CACHE_DIR, exist_ok=True)
+    with open(f"{cache_base}.json", "w", encoding="utf-8") as f:
+        json.dump({"num_nodes": num_nodes, "num_edges": num_edges}, f)
+    # Stage under a temporary name first so readers never see a partial archive
+    tmp_file = f"{cache_base}.osm.gz.tmp"
+    _materialize(osm_file, tmp_file)
+    os.replace(tmp_file, f"{cache_base}.osm.gz")
+
+def _gzip_file(src: str, dst: str) -> None:
+    """Compress src into dst with fast gzip settings and remove src."""
+    tmp_file = f"{dst}.tmp"
+    with open(src, "rb") as fin, gzip.open(tmp_file, "wb", compresslevel=1) as fout:
+        shutil.copyfileobj(fin, fout, 1 << 20)
+    # Replace rather than overwrite, since dst may be hardlinked into the cache
+    os.replace(tmp_file, dst)
+    os.remove(src)
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Helper: Stage input files into simulation directories
 # ────────────────────────────────────────────────────────────────────────────────
-def run_command(cmd: List[str], timeout: int = None) -> Tuple[bool, str]:
+def _materialize(src: str, dst: str) -> None:
+    """Make src available at dst, hardlinking when possible and copying otherwise.
+    
+    SUMO tools only read staged inputs, so a hardlink avoids copying large files.
+    """
+    if os.path.abspath(src) == os.path.abspath(dst):
+        return
+    if os.path.exists(dst):
+        if os.path.samefile(src, dst):
+            return
+        os.remove(dst)
     try:
-        completed = subprocess.run(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True,
-            check=False,
-            timeout=timeout,
-            shell=True
+        os.link(src, dst)
+    except OSError:
+        # Cross-device targets or filesystems without hardlink support
+        shutil.copy2(src, dst)
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Helper: Detect traffic lights in a network without parsing it
+# ────────────────────────────────────────────────────────────────────────────────
+def _net_has_tls(net_file: str, chunk_size: int = 1 << 20) -> bool:
+    """Return True if net_file contains at least one <tlLogic> element.
+    
+    Scans raw bytes in chunks so networks without signals skip the full XML parse.
+    """
+    marker = b"<tlLogic"
+    tail = b""
+    with open(net_file, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            window = tail + chunk
+            if marker in window:
+                return True
+            # Keep enough bytes to catch a marker split across chunk boundaries
+            tail = window[-(len(marker) - 1):]
+    return False
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Helper: Extract traffic light programs once per network
+# ────────────────────────────────────────────────────────────────────────────────
+# Private copies of extracted tls files; the user-visible files may be edited in place
+TLS_CACHE_DIR = os.path.join("data", "cache", "tls")
+
+# Maps (device, inode, size, mtime, program_id) of a network file to the private copy
+# of the tls file extracted from it and the (inode, size, mtime) of that copy
+_TLS_CACHE: Dict[Tuple[int, int, int, int, str], Tuple[str, Tuple[int, int, int]]] = {}
+
+def _copy_file(src: str, dst: str) -> None:
+    """Copy src to dst through a temporary file, so a hardlinked dst is replaced, not rewritten."""
+    tmp_file = f"{dst}.tmp"
+    shutil.copyfile(src, tmp_file)
+    os.replace(tmp_file, dst)
+
+def _extract_tls(net_file: str, tls_file: str, program_id: str) -> None:
+    """Write the tlLogic programs of net_file to tls_file, reusing earlier extractions.
+    
+    The key uses the file identity rather than its path, so hardlinked copies of a
+    network staged into run directories share one extraction. Extractions are kept as
+    private copies under TLS_CACHE_DIR and copied out, and a copy that changed since it
+    was stored is dropped, so edits to a returned tls file never leak into other runs.
+    """
+    st = os.stat(net_file)
+    key = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, program_id)
+    entry = _TLS_CACHE.pop(key, None)
+    if entry:
+        cached, identity = entry
+        try:
+            cst = os.stat(cached)
+            if (cst.st_ino, cst.st_size, cst.st_mtime_ns) == identity:
+                _copy_file(cached, tls_file)
+                _TLS_CACHE[key] = entry
+                return
+        except OSError:
+            pass
+    separate_traffic_lights(net_file, tls_file, program_id=program_id)
+    os.makedirs(TLS_CACHE_DIR, exist_ok=True)
+    cached = os.path.join(TLS_CACHE_DIR, "%s_%s_%s_%s_%s.add.xml" % key)
+    _copy_file(tls_file, cached)
+    cst = os.stat(cached)
+    _TLS_CACHE[key] = (cached, (cst.st_ino, cst.st_size, cst.st_mtime_ns))
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Helper: Check generated files
+# ────────────────────────────────────────────────────────────────────────────────
+def _size_or_zero(path: str) -> int:
+    """Return the size of path in bytes, or 0 if it does not exist, with a single stat."""
+    try:
+        return os.stat(path).st_size
+    except OSError:
+        return 0
+
+def _file_identity(path: str) -> List[Any]:
+    """Identify a file by absolute path, inode, size and modification time."""
+    st = os.stat(path)
+    return [os.path.abspath(path), st.st_ino, st.st_size, st.st_mtime_ns]
+
+def _plan_inputs_file(plan_file: str) -> str:
+    """Sidecar file recording which inputs produced a generated signal plan."""
+    return f"{plan_file}.inputs.json"
+
+def _record_plan_inputs(plan_file: str, *input_files: str) -> None:
+    """Record the identity of plan_file and of the inputs it was generated from."""
+    with open(_plan_inputs_file(plan_file), "w", encoding="utf-8") as f:
+        json.dump({
+            "plan": _file_identity(plan_file),
+            "inputs": [_file_identity(path) for path in input_files]
+        }, f)
+
+def _plan_is_current(plan_file: str, *input_files: str) -> bool:
+    """Return True if plan_file is not empty and was generated from exactly these inputs.
+    
+    Modification times alone are not enough: staged inputs are hardlinks that keep
+    the source file's mtime, so a different but older route or tls file would look
+    unchanged. The plan file itself is recorded too, so a partially rewritten plan
+    is never reused.
+    """
+    try:
+        with open(_plan_inputs_file(plan_file), "rb") as f:
+            recorded = json_loads(f.read())
+        return (
+            _size_or_zero(plan_file) > 0
+            and recorded["plan"] == _file_identity(plan_file)
+            and recorded["inputs"] == [_file_identity(path) for path in input_files]
+        )
+    except (OSError, ValueError, KeyError, TypeError):
+        return False
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Helper: Convert fixed-time signal programs to actuated control
+# ────────────────────────────────────────────────────────────────────────────────
+# Start of every actuated tls file, records the phase limits it was generated with
+ACTUATED_TLS_HEADER = "<?xml version='1.0' encoding='utf-8'?>\n<!-- actuated min_time=%s max_time=%s -->\n"
+
+def _actuated_tls_matches(actuated_tls_file: str, min_time: int, max_time: int) -> bool:
+    """Return True if actuated_tls_file was generated with the given phase limits."""
+    header = (ACTUATED_TLS_HEADER % (min_time, max_time)).encode('utf-8')
+    with open(actuated_tls_file, 'rb') as f:
+        return f.read(len(header)) == header
+
+def _write_actuated_tls(base_tls_file: str, actuated_tls_file: str, min_time: int, max_time: int) -> None:
+    """Rewrite every tlLogic in base_tls_file as an actuated program in actuated_tls_file.
+    
+    The file is parsed incrementally and each top-level element is written out and
+    released as soon as it closes. Only the program type/ID and the phase timings are
+    changed; other attributes (phase name, next, ...) and children such as <param>
+    are copied through unchanged.
+    
+    The result is written to a temporary file and moved into place at the end, since
+    base_tls_file may be the same file as actuated_tls_file (a rerun on a returned plan).
+    """
+    context = ET.iterparse(base_tls_file, events=('start', 'end'))
+    _, root = next(context)
+    depth = 1
+    min_s, max_s = str(min_time), str(max_time)
+    
+    tmp_file = f"{actuated_tls_file}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        f.write(ACTUATED_TLS_HEADER % (min_time, max_time))
+        f.write("<additional>\n")
+        
+        for event, elem in context:
+            if event == 'start':
+                depth += 1
+                continue
+            depth -= 1
+            if depth != 1:
+                continue
+            
+            if elem.tag == 'tlLogic':
+                elem.set('type', 'actuated')
+                elem.set('programID', 'actuated')
+                for phase in elem.findall('phase'):
+                    # Keep short phases (e.g. yellow) at their original length
+                    duration = phase.get('duration', '30')
+                    phase.set('duration', max_s)
+                    phase.set('minDur', duration if float(duration) < min_time else min_s)
+                    phase.set('maxDur', max_s)
+            
+            f.write(ET.tostring(elem, encoding='unicode'))
+            # Release the finished element before parsing the next one
+            root.clear()
+        
+        f.write("\n</additional>\n")
+    
+    os.replace(tmp_file, actuated_tls_file)
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Helper: Batch context log messages
+# ────────────────────────────────────────────────────────────────────────────────
+class _CtxBatcher:
+    """Collect ctx log calls and send them as few messages on exit.
+    
+    Consecutive messages of the same level are joined into one call, so a tool run
+    produces a handful of log notifications instead of one per line.
+    """
+    
+    def __init__(self, ctx: Context = None):
+        self.ctx = ctx
+        self.records: List[Tuple[str, str]] = []
+    
+    def __enter__(self) -> "_CtxBatcher":
+        return self
+    
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.flush()
+    
+    def _log(self, level: str, message: str) -> None:
+        if self.ctx:
+            self.records.append((level, message))
+    
+    def info(self, message: str) -> None:
+        self._log("info", message)
+    
+    def debug(self, message: str) -> None:
+        self._log("debug", message)
+    
+    def warning(self, message: str) -> None:
+        self._log("warning", message)
+    
+    def error(self, message: str) -> None:
+        self._log("error", message)
+    
+    def flush(self) -> None:
+        records, self.records = self.records, []
+        i = 0
+        while i < len(records):
+            level = records[i][0]
+            j = i
+            while j < len(records) and records[j][0] == level:
+                j += 1
+            getattr(self.ctx, level)("\n".join(message for _, message in records[i:j]))
+            i = j
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Helper: Stream raw OSM XML from Overpass
+# ────────────────────────────────────────────────────────────────────────────────
+async def _stream_overpass_osm(client: httpx.AsyncClient, bbox, osm_file: str) -> None:
+    """Download the road network inside bbox (west, south, east, north) from Overpass to osm_file."""
+    west, south, east, north = bbox
+    
+    # Ways matching the highway filter plus all their nodes, as OSM XML netconvert can read
+    query = (
+        f"[out:xml][timeout:300];"
+        f"way{OSM_HIGHWAY_FILTER}({south},{west},{north},{east});"
+        f"(._;>;);out body;"
+    )
+    
+    async with client.stream("POST", OVERPASS_API, data={"data": query}) as response:
+        response.raise_for_status()
+        with open(osm_file, "wb") as f:
+            async for chunk in response.aiter_bytes():
+                f.write(chunk)
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Helper: Safely run external commands
+# ────────────────────────────────────────────────────────────────────────────────
+async def run_process(cmd: List[str], timeout: int = None, log_file: str = None) -> subprocess.CompletedProcess:
+    """Run a command without blocking the event loop, merging stderr into stdout.
+    
+    If log_file is given, output goes to that file instead of memory and only the last
+    LOG_TAIL_SIZE bytes are returned, and only when the command fails.
+    Raises subprocess.TimeoutExpired after killing the process if it exceeds timeout.
+    """
+    # The argv is passed to the executable as-is without a shell, so every item must be a string
+    if not all(isinstance(arg, str) for arg in cmd):
+        raise TypeError(f"Command arguments must be strings: {cmd!r}")
+    
+    with contextlib.ExitStack() as stack:
+        log = stack.enter_context(open(log_file, "wb")) if log_file else asyncio.subprocess.PIPE
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=log,
+            stderr=asyncio.subprocess.STDOUT,
+            creationflags=SUBPROCESS_CREATIONFLAGS
         )
+        try:
+            stdout, _ = await asyncio.wait_for(process.communicate(), timeout=timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            raise subprocess.TimeoutExpired(cmd, timeout)
+    
+    if log_file:
+        stdout = b""
+        if process.returncode != 0:
+            with open(log_file, "rb") as f:
+                f.seek(max(0, os.path.getsize(log_file) - LOG_TAIL_SIZE))
+                stdout = f.read()
+    return subprocess.CompletedProcess(cmd, process.returncode, stdout.decode(errors="replace"))
+
+async def run_command_async(cmd: List[str], timeout: int = None) -> Tuple[bool, str]:
+    try:
+        completed = await run_process(cmd, timeout=timeout)
         return completed.returncode == 0, completed.stdout
     except Exception as e:
         return False, str(e)
@@ -72,6 +511,7 @@ async def osm_download_by_place(
     place_name: str,
     simulation_name: str = "sim1",
     proxy: str = "http://127.0.0.1:50563",
+    bbox: Tuple[float, float, float, float] = None,
     ctx: Context = None,
 ) -> Dict[str, Any]:
     """Download OSM data by place name and save to simulation directory.
@@ -80,106 +520,118 @@ async def osm_download_by_place(
         place_name: Place name, e.g. "West District, Beijing, China"
         simulation_name: Simulation name, used as subfolder name
         proxy: Proxy server address
+        bbox: Optional bounding box (west, south, east, north) in degrees; derived from the place name if omitted
         ctx: Context object for logging
     """
-    name = place_name.strip()
-    if not name:
-        if ctx:
-            ctx.error("Error: Place name cannot be empty")
-        return {"success": False, "message": "Error: Place name cannot be empty"}
-    if name.startswith("`") or name.startswith("{"):
-        if ctx:
-            ctx.error("Error: Invalid place name parameter")
-        return {"success": False, "message": "Error: Invalid place name parameter"}
+    with _CtxBatcher(ctx) as cb:
+        name = place_name.strip()
+        if not name:
+            cb.error("Error: Place name cannot be empty")
+            return {"success": False, "message": "Error: Place name cannot be empty"}
+        if name.startswith("`") or name.startswith("{"):
+            cb.error("Error: Invalid place name parameter")
+            return {"success": False, "message": "Error: Invalid place name parameter"}
+        if bbox is not None and len(bbox) != 4:
+            cb.error("Error: bbox must be (west, south, east, north)")
+            return {"success": False, "message": "Error: bbox must be (west, south, east, north)"}
 
-    # Create basic directory structure
-    base_dir = os.path.join("data", "simulation")
-    sim_dir = os.path.join(base_dir, simulation_name)
-    
-    # Ensure directory exists
-    os.makedirs(sim_dir, exist_ok=True)
-    
-    # Create filename with area name and date
-    sanitized_name = place_name.replace(",", "_").replace(" ", "_").replace("/", "_")
-    date_str = time.strftime("%Y%m%d")
-    output_file = os.path.join(sim_dir, f"{sanitized_name}_{date_str}.osm")
-    
-    if ctx:
-        ctx.info(f"--- Starting OSM Data Download ---")
-        ctx.info(f"Time: {time.strftime('%Y-%m-%d %H:%M:%S')}")
-        ctx.info(f"Place: {place_name}")
-        ctx.info(f"Output file: {output_file}")
-
-    # # Set proxy
-    orig_http = None
-    # orig_http, orig_https = os.environ.get("HTTP_PROXY"), os.environ.get("HTTPS_PROXY")
-    # os.environ["HTTP_PROXY"], os.environ["HTTPS_PROXY"] = proxy, proxy
-    try:
-        with contextlib.redirect_stdout(io.StringIO()) as stdout:
-            def _dl() -> Tuple[str, int, int, int]:
-                if ctx:
-                    ctx.info(f"Downloading map data using OSMnx...")
-                
-                # Download map data using OSMnx
-                G = ox.graph_from_place(name, network_type='drive', custom_filter='["highway"~"motorway|trunk|primary|secondary|tertiary"]', simplify=False, retain_all=False)
-                
-                if ctx:
-                    ctx.info(f"Download complete, saving to OSM format...")
-                    ctx.info(f"Number of nodes: {len(G.nodes)}")
-                    ctx.info(f"Number of edges: {len(G.edges)}")
-                
-                # Save as OSM file
-                ox.save_graph_xml(G, filepath=output_file)
-                size = os.path.getsize(output_file)
-                
-                if ctx:
-                    ctx.info(f"Saved as OSM file, size: {size} bytes")
-                
-                return os.path.abspath(output_file), size, len(G.nodes), len(G.edges)
-            
-            # Execute download operation asynchronously
-            filepath, size, nn, ne = await asyncio.to_thread(_dl)
+        # Create basic directory structure
+        base_dir = os.path.join("data", "simulation")
+        sim_dir = os.path.join(base_dir, simulation_name)
         
-        # Capture standard output
-        stdout_content = stdout.getvalue()
-        if stdout_content and ctx:
-            ctx.debug("Standard output:")
-            ctx.debug(stdout_content)
+        # Ensure directory exists
+        os.makedirs(sim_dir, exist_ok=True)
         
-        # Log success information
-        if ctx:
-            ctx.info("--- Download successful ---")
-            ctx.info(f"File path: {filepath}")
-            ctx.info(f"File size: {size} bytes")
-            ctx.info(f"Number of nodes: {nn}")
-            ctx.info(f"Number of edges: {ne}")
-            ctx.info(f"Completion time: {time.strftime('%Y-%m-%d %H:%M:%S')}")
+        # Create filename with area name and date
+        sanitized_name = place_name.replace(",", "_").replace(" ", "_").replace("/", "_")
+        date_str = time.strftime("%Y%m%d")
+        # Stored gzip-compressed; netconvert reads .osm.gz directly
+        output_file = os.path.join(sim_dir, f"{sanitized_name}_{date_str}.osm.gz")
         
-        return {
-            "success": True, 
-            "message": "OSM download successful", 
-            "data": {
-                "simulation_dir": os.path.abspath(sim_dir),
-                "osm_file": filepath, 
-                "file_size": size, 
-                "num_nodes": nn, 
-                "num_edges": ne
+        cb.info(f"--- Starting OSM Data Download ---")
+        cb.info(f"Time: {time.strftime('%Y-%m-%d %H:%M:%S')}")
+        cb.info(f"Place: {place_name}")
+        cb.info(f"Output file: {output_file}")
+
+        # # Set proxy
+        orig_http = None
+        # orig_http, orig_https = os.environ.get("HTTP_PROXY"), os.environ.get("HTTPS_PROXY")
+        # os.environ["HTTP_PROXY"], os.environ["HTTPS_PROXY"] = proxy, proxy
+        try:
+            with contextlib.redirect_stdout(io.StringIO()) as stdout:
+                def _dl() -> Tuple[str, int, int, int]:
+                    # Reuse a previous download of the same query if it is still fresh
+                    cache_base = _osm_cache_base(name, OSM_HIGHWAY_FILTER, bbox)
+                    cached = _load_cached_osm(cache_base, output_file)
+                    if cached is not None:
+                        cb.info(f"Loaded map data from cache: {cache_base}.osm.gz")
+                        return os.path.abspath(output_file), os.path.getsize(output_file), cached[0], cached[1]
+                    
+                    cb.info(f"Downloading map data using OSMnx...")
+                    
+                    # Query Overpass by bounding box, which is cheaper than clipping to the place polygon
+                    query_bbox = tuple(bbox) if bbox is not None else tuple(ox.geocode_to_gdf(name).total_bounds)
+                    
+                    # Download map data using OSMnx; OSMnx 2.x parses each Overpass response as it
+                    # arrives from a generator, so responses are not held in memory all at once
+                    G = ox.graph_from_bbox(query_bbox, network_type='drive', custom_filter=OSM_HIGHWAY_FILTER, simplify=False, retain_all=False)
+                    
+                    cb.info(f"Download complete, saving to OSM format...")
+                    cb.info(f"Number of nodes: {len(G.nodes)}")
+                    cb.info(f"Number of edges: {len(G.edges)}")
+                    
+                    # Save as OSM file, then compress it
+                    plain_file = output_file[:-len(".gz")]
+                    ox.save_graph_xml(G, filepath=plain_file)
+                    _gzip_file(plain_file, output_file)
+                    size = os.path.getsize(output_file)
+                    
+                    cb.info(f"Saved as compressed OSM file, size: {size} bytes")
+                    
+                    _store_cached_osm(cache_base, output_file, len(G.nodes), len(G.edges))
+                    
+                    return os.path.abspath(output_file), size, len(G.nodes), len(G.edges)
+                
+                # Execute download operation asynchronously
+                filepath, size, nn, ne = await asyncio.get_running_loop().run_in_executor(_OSMNX_EXEC, _dl)
+            
+            # Capture standard output
+            stdout_content = stdout.getvalue()
+            if stdout_content:
+                cb.debug("Standard output:")
+                cb.debug(stdout_content)
+            
+            # Log success information
+            cb.info("--- Download successful ---")
+            cb.info(f"File path: {filepath}")
+            cb.info(f"File size: {size} bytes")
+            cb.info(f"Number of nodes: {nn}")
+            cb.info(f"Number of edges: {ne}")
+            cb.info(f"Completion time: {time.strftime('%Y-%m-%d %H:%M:%S')}")
+            
+            return {
+                "success": True, 
+                "message": "OSM download successful", 
+                "data": {
+                    "simulation_dir": os.path.abspath(sim_dir),
+                    "osm_file": filepath, 
+                    "file_size": size, 
+                    "num_nodes": nn, 
+                    "num_edges": ne
+                }
             }
-        }
-    except Exception as e:
-        # Log error information
-        if ctx:
-            ctx.error(f"Error: {str(e)}")
-            import traceback
-            ctx.error(traceback.format_exc())
-        
-        return {"success": False, "message": f"OSM download failed: {e}"}
-    finally:
-        # Restore proxy settings
-        if orig_http is not None:
-            os.environ["HTTP_PROXY"] = orig_http
-        else:
-            os.environ.pop("HTTP_PROXY", None)
+        except Exception as e:
+            # Log error information
+            cb.error(f"Error: {str(e)}")
+            cb.error(traceback.format_exc())
+            
+            return {"success": False, "message": f"OSM download failed: {e}"}
+        finally:
+            # Restore proxy settings
+            if orig_http is not None:
+                os.environ["HTTP_PROXY"] = orig_http
+            else:
+                os.environ.pop("HTTP_PROXY", None)
 
 # ────────────────────────────────────────────────────────────────────────────────
 # TOOL 3: Convert to SUMO network
@@ -199,132 +651,258 @@ async def convert_osm_to_sumo(
         netconvert_options: Additional netconvert options
         ctx: Context object for logging
     """
-    # Create basic directory structure
-    base_dir = os.path.join("data", "simulation")
-    sim_dir = os.path.join(base_dir, simulation_name)
-    
-    # Ensure directory exists
-    os.makedirs(sim_dir, exist_ok=True)
-    
-    # If OSM file is not in simulation directory, copy to simulation directory
-    osm_basename = os.path.basename(osm_file)
-    sim_osm_file = os.path.join(sim_dir, osm_basename)
-    
-    if os.path.abspath(osm_file) != os.path.abspath(sim_osm_file):
-        try:
-            import shutil
-            shutil.copy2(osm_file, sim_osm_file)
-        except Exception as e:
-            if ctx:
-                ctx.error(f"Failed to copy OSM file: {e}")
-            return {"success": False, "message": f"Failed to copy OSM file: {e}"}
-    
-    # Use OSM file in simulation directory
-    osm_file = sim_osm_file
+    with _CtxBatcher(ctx) as cb:
+        # Create basic directory structure
+        base_dir = os.path.join("data", "simulation")
+        sim_dir = os.path.join(base_dir, simulation_name)
+        
+        # Ensure directory exists
+        os.makedirs(sim_dir, exist_ok=True)
+        
+        # If OSM file is not in simulation directory, copy to simulation directory
+        osm_basename = os.path.basename(osm_file)
+        sim_osm_file = os.path.join(sim_dir, osm_basename)
+        
+        if os.path.abspath(osm_file) != os.path.abspath(sim_osm_file):
+            try:
+                _materialize(osm_file, sim_osm_file)
+            except Exception as e:
+                cb.error(f"Failed to copy OSM file: {e}")
+                return {"success": False, "message": f"Failed to copy OSM file: {e}"}
+        
+        # Use OSM file in simulation directory
+        osm_file = sim_osm_file
+        
+        # Set output file path
+        output_prefix = os.path.join(sim_dir, f"{simulation_name}_net")
+        net_file = f"{output_prefix}.net.xml"
+        
+        # Use typemap file if one was found at startup
+        typemap = TYPEMAP_FILE
+        if typemap:
+            # Copy typemap to simulation directory
+            sim_typemap = os.path.join(sim_dir, typemap)
+            try:
+                _materialize(typemap, sim_typemap)
+                typemap = sim_typemap
+            except Exception:
+                # If copy fails, use original file
+                cb.warning("Failed to copy typemap file, will use original file")
+                pass
+        
+        # Log conversion process
+        cb.info(f"--- Starting OSM to SUMO network conversion ---")
+        cb.info(f"Time: {time.strftime('%Y-%m-%d %H:%M:%S')}")
+        cb.info(f"OSM file: {osm_file}")
+        cb.info(f"Output file: {net_file}")
+        
+        # Build netconvert command
+        cmd = ["netconvert", "--osm", osm_file, "--output", net_file, *NETCONVERT_OSM_OPTIONS]
+        
+        if typemap: 
+            cmd += ["--type-files", typemap]
+        
+        if netconvert_options: 
+            cmd += netconvert_options.split()
+        
+        # Log command
+        cb.info(f"Executing command: {' '.join(cmd)}")
+        
+        # Execute command
+        ok, out = await run_command_async(cmd)
+        
+        # Log output
+        cb.debug("Command output:")
+        cb.debug(out)
+        
+        if ok:
+            # Log success information
+            cb.info("--- Conversion successful ---")
+            cb.info(f"Network file: {os.path.abspath(net_file)}")
+            cb.info(f"Completion time: {time.strftime('%Y-%m-%d %H:%M:%S')}")
+            
+            # Extract traffic signal timing plan
+            tls_file = None
+            try:
+                tls_file = os.path.join(sim_dir, f"{simulation_name}_tls.add.xml")
+                if not _net_has_tls(net_file):
+                    cb.info("Network has no traffic signals, skipping timing plan extraction")
+                    tls_file = None
+                else:
+                    cb.info(f"Extracting traffic signal timing plan...")
+                    
+                    _extract_tls(net_file, tls_file, 'fixed')
+                    
+                    if _size_or_zero(tls_file) > 0:
+                        cb.info(f"Traffic signal timing plan extracted to: {tls_file}")
+                    else:
+                        cb.warning(f"No traffic signals found or extraction failed")
+                        tls_file = None
+            except Exception as e:
+                cb.warning(f"Failed to extract traffic signals: {str(e)}")
+                tls_file = None
+            
+            return {
+                "success": True, 
+                "message": "Conversion successful", 
+                "data": {
+                    "simulation_dir": os.path.abspath(sim_dir),
+                    "net_file": os.path.abspath(net_file),
+                    "tls_file": os.path.abspath(tls_file) if tls_file else None
+                }
+            }
+        else:
+            # Log failure information
+            cb.error("--- Conversion failed ---")
+            cb.error(f"Error message: {out}")
+            cb.error(f"Time: {time.strftime('%Y-%m-%d %H:%M:%S')}")
+            
+            return {
+                "success": False, 
+                "message": f"Conversion failed", 
+                "data": {
+                    "error": out
+                }
+            }
+
+# ────────────────────────────────────────────────────────────────────────────────
+# TOOL 3b: Download raw OSM and convert to SUMO network in one step
+# ────────────────────────────────────────────────────────────────────────────────
+@mcp.tool()
+async def download_and_convert(
+    place_name: str,
+    simulation_name: str = "sim1",
+    bbox: Tuple[float, float, float, float] = None,
+    netconvert_options: str = "",
+    ctx: Context = None,
+) -> Dict[str, Any]:
+    """Download OSM data for a place directly from Overpass and convert it to a SUMO network.
     
-    # Set output file path
-    output_prefix = os.path.join(sim_dir, f"{simulation_name}_net")
-    net_file = f"{output_prefix}.net.xml"
-    
-    # Check if typemap file exists
-    typemap = "typemap.xml"
-    if os.path.exists(typemap):
-        # Copy typemap to simulation directory
-        sim_typemap = os.path.join(sim_dir, typemap)
-        try:
-            import shutil
-            shutil.copy2(typemap, sim_typemap)
-            typemap = sim_typemap
-        except Exception:
-            # If copy fails, use original file
-            if ctx:
-                ctx.warning("Failed to copy typemap file, will use original file")
-            pass
+    Unlike osm_download_by_place followed by convert_osm_to_sumo, the Overpass XML is streamed
+    straight to disk for netconvert without building an OSMnx graph in between.
     
-    # Log conversion process
-    if ctx:
-        ctx.info(f"--- Starting OSM to SUMO network conversion ---")
-        ctx.info(f"Time: {time.strftime('%Y-%m-%d %H:%M:%S')}")
-        ctx.info(f"OSM file: {osm_file}")
-        ctx.info(f"Output file: {net_file}")
+    Args:
+        place_name: Place name, e.g. "West District, Beijing, China"
+        simulation_name: Simulation name, used as subfolder name
+        bbox: Optional bounding box (west, south, east, north) in degrees; derived from the place name if omitted
+        netconvert_options: Additional netconvert options
+        ctx: Context object for logging
+    """
+    name = place_name.strip()
+    if not name:
+        if ctx:
+            ctx.error("Error: Place name cannot be empty")
+        return {"success": False, "message": "Error: Place name cannot be empty"}
+    if bbox is not None and len(bbox) != 4:
+        if ctx:
+            ctx.error("Error: bbox must be (west, south, east, north)")
+        return {"success": False, "message": "Error: bbox must be (west, south, east, north)"}
     
-    # Build netconvert command
-    cmd = [
-        "netconvert", "--osm", osm_file, "--output", net_file,
-        "--geometry.remove", "--roundabouts.guess", "--ramps.guess",
-        "--junctions.join", "--tls.guess-signals", "--tls.discard-simple",
-        "--tls.join", "--output.street-names"
-    ]
+    # Create basic directory structure
+    sim_dir = os.path.join("data", "simulation", simulation_name)
+    os.makedirs(sim_dir, exist_ok=True)
     
-    if os.path.exists(typemap): 
-        cmd += ["--type-files", typemap]
+    sanitized_name = name.replace(",", "_").replace(" ", "_").replace("/", "_")
+    osm_file = os.path.join(sim_dir, f"{sanitized_name}_{time.strftime('%Y%m%d')}.osm")
     
-    if netconvert_options: 
-        cmd += netconvert_options.split()
+    try:
+        if bbox is None:
+            bbox = await asyncio.get_running_loop().run_in_executor(
+                _OSMNX_EXEC, lambda: tuple(ox.geocode_to_gdf(name).total_bounds)
+            )
+        
+        if ctx:
+            ctx.info(f"--- Starting OSM Data Download ---")
+            ctx.info(f"Place: {name}, bbox: {bbox}")
+            ctx.info(f"Output file: {osm_file}")
+        
+        async with httpx.AsyncClient(timeout=httpx.Timeout(360)) as client:
+            await _stream_overpass_osm(client, bbox, osm_file)
+    except Exception as e:
+        if ctx:
+            ctx.error(f"Error: {str(e)}")
+        return {"success": False, "message": f"OSM download failed: {e}"}
     
-    # Log command
     if ctx:
-        ctx.info(f"Executing command: {' '.join(cmd)}")
-    
-    # Execute command
-    ok, out = run_command(cmd)
+        ctx.info(f"Downloaded OSM file, size: {os.path.getsize(osm_file)} bytes")
+    
+    result = await convert_osm_to_sumo.fn(
+        osm_file,
+        simulation_name=simulation_name,
+        netconvert_options=netconvert_options,
+        ctx=ctx,
+    )
+    if result.get("success"):
+        result["data"]["osm_file"] = os.path.abspath(osm_file)
+    return result
+
+# ────────────────────────────────────────────────────────────────────────────────
+# TOOL 3c: Download and convert several places concurrently
+# ────────────────────────────────────────────────────────────────────────────────
+@mcp.tool()
+async def osm_download_many(
+    place_names: List[str],
+    simulation_name: str = "sim1",
+    netconvert_options: str = "",
+    ctx: Context = None,
+) -> Dict[str, Any]:
+    """Download OSM data for several places concurrently and convert each to a SUMO network.
     
-    # Log output
-    if ctx:
-        ctx.debug("Command output:")
-        ctx.debug(out)
+    All Overpass requests share one HTTP client, and each place is stored in its own
+    simulation directory named "<simulation_name>_<place>".
     
-    if ok:
-        # Log success information
+    Args:
+        place_names: Place names, e.g. ["West District, Beijing, China", "East District, Beijing, China"]
+        simulation_name: Simulation name prefix, used for the per-place subfolder names
+        netconvert_options: Additional netconvert options
+        ctx: Context object for logging
+    """
+    names = [n.strip() for n in place_names if n and n.strip()]
+    if not names:
         if ctx:
-            ctx.info("--- Conversion successful ---")
-            ctx.info(f"Network file: {os.path.abspath(net_file)}")
-            ctx.info(f"Completion time: {time.strftime('%Y-%m-%d %H:%M:%S')}")
+            ctx.error("Error: Place names cannot be empty")
+        return {"success": False, "message": "Error: Place names cannot be empty"}
+    
+    if ctx:
+        ctx.info(f"--- Starting OSM Data Download for {len(names)} places ---")
+    
+    async def _one(client: httpx.AsyncClient, name: str) -> Dict[str, Any]:
+        sanitized_name = name.replace(",", "_").replace(" ", "_").replace("/", "_")
+        place_sim_name = f"{simulation_name}_{sanitized_name}"
+        sim_dir = os.path.join("data", "simulation", place_sim_name)
+        os.makedirs(sim_dir, exist_ok=True)
+        osm_file = os.path.join(sim_dir, f"{sanitized_name}_{time.strftime('%Y%m%d')}.osm")
         
-        # Extract traffic signal timing plan
-        tls_file = None
         try:
-            tls_file = os.path.join(sim_dir, f"{simulation_name}_tls.add.xml")
-            if ctx:
-                ctx.info(f"Extracting traffic signal timing plan...")
-            
-            separate_traffic_lights(net_file, tls_file, program_id='fixed')
-            
-            if os.path.exists(tls_file) and os.path.getsize(tls_file) > 0:
-                if ctx:
-                    ctx.info(f"Traffic signal timing plan extracted to: {tls_file}")
-            else:
-                if ctx:
-                    ctx.warning(f"No traffic signals found or extraction failed")
-                tls_file = None
+            bbox = await asyncio.get_running_loop().run_in_executor(
+                _OSMNX_EXEC, lambda: tuple(ox.geocode_to_gdf(name).total_bounds)
+            )
+            await _stream_overpass_osm(client, bbox, osm_file)
         except Exception as e:
             if ctx:
-                ctx.warning(f"Failed to extract traffic signals: {str(e)}")
-            tls_file = None
-        
-        return {
-            "success": True, 
-            "message": "Conversion successful", 
-            "data": {
-                "simulation_dir": os.path.abspath(sim_dir),
-                "net_file": os.path.abspath(net_file),
-                "tls_file": os.path.abspath(tls_file) if tls_file else None
-            }
-        }
-    else:
-        # Log failure information
-        if ctx:
-            ctx.error("--- Conversion failed ---")
-            ctx.error(f"Error message: {out}")
-            ctx.error(f"Time: {time.strftime('%Y-%m-%d %H:%M:%S')}")
+                ctx.error(f"Download failed for {name}: {str(e)}")
+            return {"success": False, "message": f"OSM download failed: {e}"}
         
-        return {
-            "success": False, 
-            "message": f"Conversion failed", 
-            "data": {
-                "error": out
-            }
-        }
+        result = await convert_osm_to_sumo.fn(
+            osm_file,
+            simulation_name=place_sim_name,
+            netconvert_options=netconvert_options,
+            ctx=ctx,
+        )
+        if result.get("success"):
+            result["data"]["osm_file"] = os.path.abspath(osm_file)
+        return result
+    
+    limits = httpx.Limits(max_connections=4)
+    async with httpx.AsyncClient(timeout=httpx.Timeout(360), limits=limits) as client:
+        results = await asyncio.gather(*(_one(client, name) for name in names))
+    
+    succeeded = sum(1 for r in results if r.get("success"))
+    return {
+        "success": succeeded == len(names),
+        "message": f"{succeeded}/{len(names)} places downloaded and converted",
+        "data": dict(zip(names, results)),
+    }
 
 # ────────────────────────────────────────────────────────────────────────────────
 # TOOL 4: Generate random trips and routes
@@ -366,8 +944,7 @@ async def generate_random_trips(
     
     if os.path.abspath(net_file) != os.path.abspath(sim_net_file):
         try:
-            import shutil
-            shutil.copy2(net_file, sim_net_file)
+            _materialize(net_file, sim_net_file)
         except Exception as e:
             if ctx:
                 ctx.error(f"Failed to copy network file: {e}")
@@ -381,16 +958,12 @@ async def generate_random_trips(
     trips_file = f"{output_prefix}.trips.xml"
     rou_file = f"{output_prefix}.rou.xml"
     
-    # Find randomTrips.py script
-    script = os.path.join(os.environ.get("SUMO_HOME", ""), "tools", "randomTrips.py")
-    if not os.path.exists(script):
-        alt_script = os.path.join(os.path.dirname(__file__), "tools", "randomTrips.py")
-        if os.path.exists(alt_script):
-            script = alt_script
-        else:
-            if ctx:
-                ctx.error(f"Script not found: randomTrips.py")
-            return {"success": False, "message": f"Script not found: randomTrips.py"}
+    # Use randomTrips.py script located at startup
+    script = RANDOM_TRIPS_SCRIPT
+    if script is None:
+        if ctx:
+            ctx.error(f"Script not found: randomTrips.py")
+        return {"success": False, "message": f"Script not found: randomTrips.py"}
     
     try:
         # Log process
@@ -404,7 +977,7 @@ async def generate_random_trips(
         
         # Build randomTrips command
         cmd1 = [
-            "python", script, "-n", net_file, "-o", trips_file,
+            sys.executable, script, "-n", net_file, "-o", trips_file,
             "-p", str((end_time - begin_time) / num_trips), "-b", str(begin_time), "-e", str(end_time)
         ]
         
@@ -413,15 +986,7 @@ async def generate_random_trips(
             ctx.info(f"Executing command: {' '.join(cmd1)}")
         
         # Execute randomTrips command
-        process = subprocess.run(
-            cmd1,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True,
-            check=False,
-            timeout=300,  # 5 minutes timeout
-            shell=True
-        )
+        process = await run_process(cmd1, timeout=300)  # 5 minutes timeout
         
         # Log output
         if ctx:
@@ -456,15 +1021,7 @@ async def generate_random_trips(
             ctx.info(f"Executing command: {' '.join(cmd2)}")
         
         # Execute duarouter command
-        process2 = subprocess.run(
-            cmd2,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True,
-            check=False,
-            timeout=300,
-            shell=True
-        )
+        process2 = await run_process(cmd2, timeout=300)
         
         # Log output
         if ctx:
@@ -512,7 +1069,6 @@ async def generate_random_trips(
             "message": f"Command execution timed out"
         }
     except Exception as e:
-        import traceback
         if ctx:
             ctx.error(f"Error: {str(e)}")
             ctx.error(traceback.format_exc())
@@ -580,20 +1136,17 @@ async def create_sumo_config(
     # Copy files if source and destination are different
     try:
         if os.path.abspath(net_file) != os.path.abspath(dst_net_file):
-            import shutil
-            shutil.copy2(net_file, dst_net_file)
+            _materialize(net_file, dst_net_file)
             if ctx:
                 ctx.debug(f"Copied network file: {net_file} -> {dst_net_file}")
         
         if os.path.abspath(route_file) != os.path.abspath(dst_route_file):
-            import shutil
-            shutil.copy2(route_file, dst_route_file)
+            _materialize(route_file, dst_route_file)
             if ctx:
                 ctx.debug(f"Copied route file: {route_file} -> {dst_route_file}")
         
         if tls_file and os.path.exists(tls_file) and os.path.abspath(tls_file) != os.path.abspath(dst_tls_file):
-            import shutil
-            shutil.copy2(tls_file, dst_tls_file)
+            _materialize(tls_file, dst_tls_file)
             if ctx:
                 ctx.debug(f"Copied traffic signal file: {tls_file} -> {dst_tls_file}")
     except Exception as e:
@@ -613,34 +1166,16 @@ async def create_sumo_config(
     if additional_files:
         additional_files_str = f'<additional-files value="{",".join(additional_files)}"/>'
     
-    config_content = f"""<?xml version="1.0" encoding="UTF-8"?>
-<configuration xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:noNamespaceSchemaLocation="http://sumo.dlr.de/xsd/sumoConfiguration.xsd">
-    <input>
-        <net-file value="{net_basename}"/>
-        <route-files value="{route_basename}"/>
-        {additional_files_str}
-    </input>
-    <time>
-        <begin value="{begin_time}"/>
-        <end value="{end_time}"/>
-    </time>
-    <processing>
-        <ignore-route-errors value="true"/>
-    </processing>
-    <routing>
-        <device.rerouting.adaptation-steps value="18"/>
-        <device.rerouting.adaptation-interval value="10"/>
-    </routing>
-    <report>
-        <verbose value="true"/>
-        <duration-log.statistics value="true"/>
-        <no-step-log value="true"/>
-    </report>
-</configuration>
-"""
+    config_content = SUMO_CONFIG_TEMPLATE % {
+        "net_file": net_basename,
+        "route_files": route_basename,
+        "additional_files": additional_files_str,
+        "begin_time": begin_time,
+        "end_time": end_time,
+    }
     try:
-        with open(output_file, "w") as f:
-            f.write(config_content)
+        with open(output_file, "wb", buffering=0) as f:
+            f.write(config_content.encode("utf-8"))
         
         if ctx:
             ctx.info(f"Configuration file created: {output_file}")
@@ -727,17 +1262,16 @@ async def run_simulation(
     
     # Copy necessary files to run directory
     try:
-        import shutil
         dst_net_file = os.path.join(run_dir, os.path.basename(net_file))
         dst_route_file = os.path.join(run_dir, os.path.basename(route_file))
         
         if os.path.abspath(net_file) != os.path.abspath(dst_net_file):
-            shutil.copy2(net_file, dst_net_file)
+            _materialize(net_file, dst_net_file)
             if ctx:
                 ctx.debug(f"Copied network file: {net_file} -> {dst_net_file}")
         
         if os.path.abspath(route_file) != os.path.abspath(dst_route_file):
-            shutil.copy2(route_file, dst_route_file)
+            _materialize(route_file, dst_route_file)
             if ctx:
                 ctx.debug(f"Copied route file: {route_file} -> {dst_route_file}")
         
@@ -760,7 +1294,7 @@ async def run_simulation(
                 dst_tls_file = os.path.join(run_dir, os.path.basename(tls_file))
                 if os.path.abspath(tls_file) != os.path.abspath(dst_tls_file):
                     try:
-                        shutil.copy2(tls_file, dst_tls_file)
+                        _materialize(tls_file, dst_tls_file)
                         final_tls_file = dst_tls_file
                         if ctx:
                             ctx.info(f"Using provided fixed timing plan: {dst_tls_file}")
@@ -778,10 +1312,9 @@ async def run_simulation(
                     ctx.info(f"Extracting default traffic signal timing plan from network file...")
                 
                 extracted_tls_file = os.path.join(run_dir, f"{control_type}_tls.add.xml")
-                from tools.separate_light import separate_traffic_lights
-                separate_traffic_lights(dst_net_file, extracted_tls_file, program_id='fixed')
+                _extract_tls(dst_net_file, extracted_tls_file, 'fixed')
                 
-                if os.path.exists(extracted_tls_file) and os.path.getsize(extracted_tls_file) > 0:
+                if _size_or_zero(extracted_tls_file) > 0:
                     final_tls_file = extracted_tls_file
                     if ctx:
                         ctx.info(f"Successfully extracted default traffic signal timing plan: {extracted_tls_file}")
@@ -798,7 +1331,13 @@ async def run_simulation(
         
         # First try to get base timing plan (from provided file or extract from network file)
         base_tls_file = None
-        if tls_file and os.path.exists(tls_file):
+        base_inputs = [tls_file] if tls_file and os.path.exists(tls_file) else [dst_net_file]
+        if _plan_is_current(actuated_tls_file, *base_inputs) and _actuated_tls_matches(actuated_tls_file, min_time, max_time):
+            # Same inputs and phase limits as the last run
+            final_tls_file = actuated_tls_file
+            if ctx:
+                ctx.info(f"Reusing existing actuated control plan: {actuated_tls_file}")
+        elif tls_file and os.path.exists(tls_file):
             base_tls_file = tls_file
             if ctx:
                 ctx.info(f"Using provided signal file as base: {tls_file}")
@@ -807,11 +1346,11 @@ async def run_simulation(
                 if ctx:
                     ctx.info(f"Extracting base traffic signal timing plan from network file...")
                 
+                # The actuated rewrite sets its own programID, so share the fixed-time extraction
                 temp_tls_file = os.path.join(run_dir, "temp_tls.add.xml")
-                from tools.separate_light import separate_traffic_lights
-                separate_traffic_lights(dst_net_file, temp_tls_file, program_id='actuated')
+                _extract_tls(dst_net_file, temp_tls_file, 'fixed')
                 
-                if os.path.exists(temp_tls_file) and os.path.getsize(temp_tls_file) > 0:
+                if _size_or_zero(temp_tls_file) > 0:
                     base_tls_file = temp_tls_file
                     if ctx:
                         ctx.info(f"Successfully extracted base traffic signal timing plan")
@@ -825,35 +1364,12 @@ async def run_simulation(
         # Convert base timing plan to actuated control
         if base_tls_file:
             try:
-                import xml.etree.ElementTree as ET
-                
                 if ctx:
                     ctx.info(f"Converting traffic signal timing plan to actuated control...")
                 
-                # Parse original tls file
-                tree = ET.parse(base_tls_file)
-                root = tree.getroot()
-                
-                # Convert to actuated control
-                for tlLogic in root.findall('./tlLogic'):
-                    # Set as actuated control
-                    tlLogic.set('type', 'actuated')
-                    tlLogic.set('programID', 'actuated')
-                    
-                    # Modify each phase
-                    for phase in tlLogic.findall('./phase'):
-                        # Get original phase information
-                        duration = int(phase.get('duration', '30'))
-                        state = phase.get('state', '')
-                        
-                        # Set actuated phase attributes
-                        phase.set('duration', str(max_time))
-                        phase.set('minDur', str(min(min_time, duration)))
-                        phase.set('maxDur', str(max_time))
-                        phase.set('state', state)
-                
-                # Save converted file
-                tree.write(actuated_tls_file, encoding='utf-8', xml_declaration=True)
+                # Convert to actuated control and save converted file
+                _write_actuated_tls(base_tls_file, actuated_tls_file, min_time, max_time)
+                _record_plan_inputs(actuated_tls_file, *base_inputs)
                 final_tls_file = actuated_tls_file
                 
                 if ctx:
@@ -865,223 +1381,206 @@ async def run_simulation(
     elif control_type == "webster":
         # Webster timing mode
         # Find tlsCycleAdaptation.py script
-        sumo_tools_dir = os.path.join(os.environ.get("SUMO_HOME", ""), "tools")
-        tls_script = os.path.join(sumo_tools_dir, "tlsCycleAdaptation.py")
-        
-        if not os.path.exists(tls_script):
-            alt_script = os.path.join(os.path.dirname(__file__), "tools", "tlsCycleAdaptation.py")
-            if os.path.exists(alt_script):
-                tls_script = alt_script
-            else:
-                if ctx:
-                    ctx.error(f"Script not found: tlsCycleAdaptation.py")
-                return {"success": False, "message": f"Script not found: tlsCycleAdaptation.py"}
+        tls_script = WEBSTER_SCRIPT
+        if not tls_script:
+            if ctx:
+                ctx.error(f"Script not found: tlsCycleAdaptation.py")
+            return {"success": False, "message": f"Script not found: tlsCycleAdaptation.py"}
         
         # Generate Webster timing plan
         webster_tls_file = os.path.join(run_dir, f"{control_type}_tls.add.xml")
         
-        try:
-            if ctx:
-                ctx.info(f"Generating Webster timing plan...")
-            
-            # Build command
-            webster_cmd = [
-                "python",
-                tls_script,
-                "-n", dst_net_file,
-                "-r", dst_route_file,
-                "-o", webster_tls_file
-            ]
-            
-            # Log command
-            if ctx:
-                ctx.info(f"Executing command: {' '.join(webster_cmd)}")
-            
-            # Execute command
-            process = subprocess.run(
-                webster_cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                check=False,
-                timeout=300,  # 5 minutes timeout
-                shell=True
-            )
-            
-            # Log output
+        if _plan_is_current(webster_tls_file, dst_net_file, dst_route_file):
+            # Same network and route files as the last run
+            final_tls_file = webster_tls_file
             if ctx:
-                ctx.debug(f"Command return code: {process.returncode}")
-                ctx.debug("Command output:")
-                ctx.debug(process.stdout)
-            
-            if process.returncode != 0:
+                ctx.info(f"Reusing existing Webster timing plan: {webster_tls_file}")
+        else:
+            try:
                 if ctx:
-                    ctx.error("Failed to generate Webster timing")
-                return {
-                    "success": False,
-                    "message": "Failed to generate Webster timing",
-                    "error": process.stdout
-                }
-            
-            if not os.path.exists(webster_tls_file) or os.path.getsize(webster_tls_file) == 0:
+                    ctx.info(f"Generating Webster timing plan...")
+                
+                # Build command
+                webster_cmd = [
+                    sys.executable,
+                    tls_script,
+                    "-n", dst_net_file,
+                    "-r", dst_route_file,
+                    "-o", webster_tls_file
+                ]
+                
+                # Log command
                 if ctx:
-                    ctx.error("Webster timing file generation failed or is empty")
-                return {
-                    "success": False,
-                    "message": "Webster timing file generation failed or is empty"
-                }
+                    ctx.info(f"Executing command: {' '.join(webster_cmd)}")
+                
+                # Execute command
+                process = await run_process(webster_cmd, timeout=300, log_file=os.path.join(run_dir, "tls.log"))  # 5 minutes timeout
+                
+                # Log output
+                if ctx:
+                    ctx.debug(f"Command return code: {process.returncode}")
+                    ctx.debug("Command output:")
+                    ctx.debug(process.stdout)
+                
+                if process.returncode != 0:
+                    if ctx:
+                        ctx.error("Failed to generate Webster timing")
+                    return {
+                        "success": False,
+                        "message": "Failed to generate Webster timing",
+                        "error": process.stdout
+                    }
+                
+                if _size_or_zero(webster_tls_file) == 0:
+                    if ctx:
+                        ctx.error("Webster timing file generation failed or is empty")
+                    return {
+                        "success": False,
+                        "message": "Webster timing file generation failed or is empty"
+                    }
+                
+                _record_plan_inputs(webster_tls_file, dst_net_file, dst_route_file)
+                final_tls_file = webster_tls_file
+                if ctx:
+                    ctx.info(f"Successfully generated Webster timing plan: {webster_tls_file}")
             
-            final_tls_file = webster_tls_file
-            if ctx:
-                ctx.info(f"Successfully generated Webster timing plan: {webster_tls_file}")
-        
-        except Exception as e:
-            if ctx:
-                ctx.error(f"Failed to generate Webster timing: {str(e)}")
-            return {"success": False, "message": f"Failed to generate Webster timing: {str(e)}"}
+            except Exception as e:
+                if ctx:
+                    ctx.error(f"Failed to generate Webster timing: {str(e)}")
+                return {"success": False, "message": f"Failed to generate Webster timing: {str(e)}"}
     
     elif control_type == "greenwave":
         # Green wave timing mode
         # Find tlsCoordinator.py script
-        sumo_tools_dir = os.path.join(os.environ.get("SUMO_HOME", ""), "tools")
-        tls_script = os.path.join(sumo_tools_dir, "tlsCoordinator.py")
-        
-        if not os.path.exists(tls_script):
-            alt_script = os.path.join(os.path.dirname(__file__), "tools", "tlsCoordinator.py")
-            if os.path.exists(alt_script):
-                tls_script = alt_script
-            else:
-                if ctx:
-                    ctx.error(f"Script not found: tlsCoordinator.py")
-                return {"success": False, "message": f"Script not found: tlsCoordinator.py"}
+        tls_script = GREENWAVE_SCRIPT
+        if not tls_script:
+            if ctx:
+                ctx.error(f"Script not found: tlsCoordinator.py")
+            return {"success": False, "message": f"Script not found: tlsCoordinator.py"}
         
         # Generate green wave timing plan
         greenwave_tls_file = os.path.join(run_dir, f"{control_type}_tls.add.xml")
         
-        try:
-            if ctx:
-                ctx.info(f"Generating green wave coordination timing plan...")
-            
-            # Build command
-            greenwave_cmd = [
-                "python",
-                tls_script,
-                "-n", dst_net_file,
-                "-r", dst_route_file,
-                "-o", greenwave_tls_file
-            ]
-            
-            # Log command
-            if ctx:
-                ctx.info(f"Executing command: {' '.join(greenwave_cmd)}")
-            
-            # Execute command
-            process = subprocess.run(
-                greenwave_cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                check=False,
-                timeout=300,  # 5 minutes timeout
-                shell=True
-            )
-            
-            # Log output
+        if _plan_is_current(greenwave_tls_file, dst_net_file, dst_route_file):
+            # Same network and route files as the last run
+            final_tls_file = greenwave_tls_file
             if ctx:
-                ctx.debug(f"Command return code: {process.returncode}")
-                ctx.debug("Command output:")
-                ctx.debug(process.stdout)
-            
-            if process.returncode != 0:
+                ctx.info(f"Reusing existing green wave coordination timing plan: {greenwave_tls_file}")
+        else:
+            try:
                 if ctx:
-                    ctx.error("Failed to generate green wave coordination timing")
-                return {
-                    "success": False,
-                    "message": "Failed to generate green wave coordination timing",
-                    "error": process.stdout
-                }
-            
-            if not os.path.exists(greenwave_tls_file) or os.path.getsize(greenwave_tls_file) == 0:
+                    ctx.info(f"Generating green wave coordination timing plan...")
+                
+                # Build command
+                greenwave_cmd = [
+                    sys.executable,
+                    tls_script,
+                    "-n", dst_net_file,
+                    "-r", dst_route_file,
+                    "-o", greenwave_tls_file
+                ]
+                
+                # Log command
                 if ctx:
-                    ctx.error("Green wave coordination timing file generation failed or is empty")
-                return {
-                    "success": False,
-                    "message": "Green wave coordination timing file generation failed or is empty"
-                }
+                    ctx.info(f"Executing command: {' '.join(greenwave_cmd)}")
+                
+                # Execute command
+                process = await run_process(greenwave_cmd, timeout=300, log_file=os.path.join(run_dir, "tls.log"))  # 5 minutes timeout
+                
+                # Log output
+                if ctx:
+                    ctx.debug(f"Command return code: {process.returncode}")
+                    ctx.debug("Command output:")
+                    ctx.debug(process.stdout)
+                
+                if process.returncode != 0:
+                    if ctx:
+                        ctx.error("Failed to generate green wave coordination timing")
+                    return {
+                        "success": False,
+                        "message": "Failed to generate green wave coordination timing",
+                        "error": process.stdout
+                    }
+                
+                if _size_or_zero(greenwave_tls_file) == 0:
+                    if ctx:
+                        ctx.error("Green wave coordination timing file generation failed or is empty")
+                    return {
+                        "success": False,
+                        "message": "Green wave coordination timing file generation failed or is empty"
+                    }
+                
+                _record_plan_inputs(greenwave_tls_file, dst_net_file, dst_route_file)
+                final_tls_file = greenwave_tls_file
+                if ctx:
+                    ctx.info(f"Successfully generated green wave coordination timing plan: {greenwave_tls_file}")
             
-            final_tls_file = greenwave_tls_file
-            if ctx:
-                ctx.info(f"Successfully generated green wave coordination timing plan: {greenwave_tls_file}")
-        
-        except Exception as e:
-            if ctx:
-                ctx.error(f"Failed to generate green wave coordination timing: {str(e)}")
-            return {"success": False, "message": f"Failed to generate green wave coordination timing: {str(e)}"}
-    
-    # Generate simulation configuration file
-    config_file = os.path.join(run_dir, f"sim.sumocfg")
+            except Exception as e:
+                if ctx:
+                    ctx.error(f"Failed to generate green wave coordination timing: {str(e)}")
+                return {"success": False, "message": f"Failed to generate green wave coordination timing: {str(e)}"}
     
-    # Add traffic signal file to configuration if available
-    additional_files_str = ""
-    if final_tls_file and os.path.exists(final_tls_file):
-        additional_files_str = f'<additional-files value="{os.path.basename(final_tls_file)}"/>'
+    # Add traffic signal file to the run if available
+    has_tls_file = bool(final_tls_file and os.path.exists(final_tls_file))
+    config_file = None
     
-    config_content = f"""<?xml version="1.0" encoding="UTF-8"?>
-<configuration xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:noNamespaceSchemaLocation="http://sumo.dlr.de/xsd/sumoConfiguration.xsd">
-    <input>
-        <net-file value="{os.path.basename(dst_net_file)}"/>
-        <route-files value="{os.path.basename(dst_route_file)}"/>
-        {additional_files_str}
-    </input>
-    <time>
-        <begin value="{begin_time}"/>
-        <end value="{end_time}"/>
-    </time>
-    <output>
-        <tripinfo-output value="{os.path.basename(tripinfo_file)}"/>
-    </output>
-    <processing>
-        <ignore-route-errors value="true"/>
-        <time-to-teleport value="300"/>
-        <collision.action value="warn"/>
-    </processing>
-    <report>
-        <verbose value="true"/>
-        <duration-log.statistics value="true"/>
-        <no-step-log value="true"/>
-    </report>
-</configuration>
-"""
     try:
-        with open(config_file, "w") as f:
-            f.write(config_content)
+        if gui:
+            # sumo-gui keeps a saveable configuration file
+            config_file = os.path.join(run_dir, f"sim.sumocfg")
+            
+            additional_files_str = ""
+            if has_tls_file:
+                additional_files_str = f'<additional-files value="{os.path.basename(final_tls_file)}"/>'
+            
+            config_content = RUN_CONFIG_TEMPLATE % {
+                "net_file": os.path.basename(dst_net_file),
+                "route_files": os.path.basename(dst_route_file),
+                "additional_files": additional_files_str,
+                "begin_time": begin_time,
+                "end_time": end_time,
+                "tripinfo_file": os.path.basename(tripinfo_file),
+            }
+            with open(config_file, "wb", buffering=0) as f:
+                f.write(config_content.encode("utf-8"))
+            
+            # Build SUMO command
+            sumo_cmd = ["sumo-gui", "-c", config_file]
+        else:
+            # Batch runs pass the same options on the command line instead of writing a configuration file
+            sumo_cmd = [
+                "sumo",
+                "-n", dst_net_file,
+                "-r", dst_route_file,
+                "-b", str(begin_time),
+                "-e", str(end_time),
+                "--tripinfo-output", tripinfo_file,
+                "--ignore-route-errors", "true",
+                "--time-to-teleport", "300",
+                "--collision.action", "warn",
+                "--verbose", "true",
+                "--duration-log.statistics", "true",
+                "--no-step-log", "true",
+            ]
+            if has_tls_file:
+                sumo_cmd += ["--additional-files", final_tls_file]
         
         if ctx:
             ctx.info(f"--- Starting {control_type} control simulation {control_type} ---")
             ctx.info(f"Time: {time.strftime('%Y-%m-%d %H:%M:%S')}")
             ctx.info(f"Network file: {dst_net_file}")
             ctx.info(f"Route file: {dst_route_file}")
-            if final_tls_file and os.path.exists(final_tls_file):
+            if has_tls_file:
                 ctx.info(f"Signal file: {final_tls_file}")
-            ctx.info(f"Created simulation configuration file: {config_file}")
-        
-        # Build SUMO command
-        sumo_cmd = ["sumo-gui" if gui else "sumo", "-c", config_file]
+            if config_file:
+                ctx.info(f"Created simulation configuration file: {config_file}")
         
         # Log command
         if ctx:
             ctx.info(f"Executing command: {' '.join(sumo_cmd)}")
         
         # Execute SUMO command
-        process = subprocess.run(
-            sumo_cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True,
-            check=False,
-            timeout=600,  # 10 minutes timeout
-            shell=True
-        )
+        process = await run_process(sumo_cmd, timeout=600, log_file=os.path.join(run_dir, "sumo.log"))  # 10 minutes timeout
         
         # Log output
         if ctx:
@@ -1099,7 +1598,7 @@ async def run_simulation(
             }
         
         # Check result file
-        if not os.path.exists(tripinfo_file) or os.path.getsize(tripinfo_file) == 0:
+        if _size_or_zero(tripinfo_file) == 0:
             if ctx:
                 ctx.error("Tripinfo file generation failed or is empty")
             return {
@@ -1118,7 +1617,7 @@ async def run_simulation(
             "message": f"{control_type} control simulation completed",
             "data": {
                 "run_dir": os.path.abspath(run_dir),
-                "config_file": os.path.abspath(config_file),
+                "config_file": os.path.abspath(config_file) if config_file else None,
                 "tripinfo_file": os.path.abspath(tripinfo_file),
                 "tls_file": os.path.abspath(final_tls_file) if final_tls_file else None,
                 "control_type": control_type
@@ -1133,7 +1632,6 @@ async def run_simulation(
             "message": "Simulation execution timed out"
         }
     except Exception as e:
-        import traceback
         if ctx:
             ctx.error(f"Failed to execute simulation: {str(e)}")
             ctx.error(traceback.format_exc())
@@ -1142,6 +1640,72 @@ async def run_simulation(
             "message": f"Failed to execute simulation: {str(e)}"
         }
 
+# ────────────────────────────────────────────────────────────────────────────────
+# TOOL 6b: Run all control types concurrently
+# ────────────────────────────────────────────────────────────────────────────────
+@mcp.tool()
+async def run_all_controls(
+    net_file: str,
+    route_file: str,
+    simulation_name: str = "sim1",
+    tls_file: str = None,
+    begin_time: int = 0,
+    end_time: int = 3600,
+    min_time: int = 5,
+    max_time: int = 60,
+    ctx: Context = None,
+) -> Dict[str, Any]:
+    """Run fixed, actuated, Webster and green wave control simulations concurrently for comparison.
+    
+    Args:
+        net_file: Network file path
+        route_file: Route file path
+        simulation_name: Simulation name, used as subfolder name
+        tls_file: Traffic signal timing file path, used as the fixed/actuated base plan if provided
+        begin_time: Start time (seconds)
+        end_time: End time (seconds)
+        min_time: Minimum phase time (seconds), only for actuated control
+        max_time: Maximum phase time (seconds), only for actuated control
+        ctx: Context object for logging
+    """
+    control_types = ["fixed", "actuated", "webster", "greenwave"]
+    
+    # Each run is a separate SUMO process, bound how many run at the same time
+    semaphore = asyncio.Semaphore(max(1, (os.cpu_count() or 2) // 2))
+    
+    async def _run(control_type: str) -> Dict[str, Any]:
+        async with semaphore:
+            return await run_simulation.fn(
+                net_file, route_file,
+                simulation_name=simulation_name,
+                control_type=control_type,
+                tls_file=tls_file,
+                gui=False,
+                begin_time=begin_time,
+                end_time=end_time,
+                min_time=min_time,
+                max_time=max_time,
+                ctx=ctx,
+            )
+    
+    if ctx:
+        ctx.info(f"--- Starting {', '.join(control_types)} control simulations ---")
+    
+    results = await asyncio.gather(*(_run(control_type) for control_type in control_types))
+    failed = [control_type for control_type, result in zip(control_types, results) if not result.get("success")]
+    
+    if ctx:
+        if failed:
+            ctx.warning(f"Failed control simulations: {', '.join(failed)}")
+        else:
+            ctx.info("--- All control simulations completed ---")
+    
+    return {
+        "success": not failed,
+        "message": f"Failed control simulations: {', '.join(failed)}" if failed else "All control simulations completed",
+        "data": dict(zip(control_types, results))
+    }
+
 # ────────────────────────────────────────────────────────────────────────────────
 # TOOL 7: Compare multiple simulation results' performance metrics and generate charts
 # ────────────────────────────────────────────────────────────────────────────────
@@ -1162,12 +1726,11 @@ async def compare_simulation_results(
     # Process tripinfo_files parameter
     if isinstance(tripinfo_files, str):
         # If it's a string, try to parse as JSON
-        import json
         try:
             if tripinfo_files.startswith("[") and tripinfo_files.endswith("]"):
                 # First replace backslashes in JSON string with forward slashes or double backslashes
                 normalized_json = tripinfo_files.replace("\\", "/")
-                tripinfo_files = json.loads(normalized_json)
+                tripinfo_files = json_loads(normalized_json)
             else:
                 # May be a single file path or comma-separated multiple paths
                 if "," in tripinfo_files:
@@ -1200,10 +1763,9 @@ async def compare_simulation_results(
     if labels is not None:
         if isinstance(labels, str):
             # If it's a string, try to parse as JSON
-            import json
             try:
                 if labels.startswith("[") and labels.endswith("]"):
-                    labels = json.loads(labels)
+                    labels = json_loads(labels)
                 else:
                     # May be a single label or comma-separated multiple labels
                     if "," in labels:
@@ -1222,33 +1784,35 @@ async def compare_simulation_results(
             ctx.error("Error: At least one tripinfo file is required")
         return {"success": False, "message": "Error: At least one tripinfo file is required"}
     
-    # Verify all files exist
+    # Verify all files exist, sending the per-file lookup messages as one batch
     missing_files = []
-    for f in tripinfo_files:
-        if not os.path.exists(f):
-            # Try different path formats
-            alt_paths = [
-                f.replace("/", "\\"),  # Forward slash to backslash
-                f.replace("\\", "/"),  # Backslash to forward slash
-                f.replace("//", "/"),  # Double forward slash to single forward slash
-                f.replace("\\\\", "\\")  # Double backslash to single backslash
-            ]
-            
-            found = False
-            for alt_path in alt_paths:
-                if os.path.exists(alt_path):
-                    # Update to valid path
-                    tripinfo_files[tripinfo_files.index(f)] = alt_path
-                    found = True
-                    if ctx:
-                        ctx.debug(f"Found alternative path: {alt_path}")
-                    break
-            
-            if not found:
-                missing_files.append(f)
-                if ctx:
-                    ctx.debug(f"File does not exist: {f}")
-                    ctx.debug(f"None of the alternative paths exist")
+    with _CtxBatcher(ctx) as cb:
+        for i, f in enumerate(tripinfo_files):
+            if not os.path.exists(f):
+                # Try different path formats, only those that differ from the original path
+                alt_paths = []
+                if os.sep == "\\" and "/" in f:
+                    alt_paths.append(f.replace("/", "\\"))  # Forward slash to backslash
+                if "\\" in f:
+                    alt_paths.append(f.replace("\\", "/"))  # Backslash to forward slash
+                if "//" in f:
+                    alt_paths.append(f.replace("//", "/"))  # Double forward slash to single forward slash
+                if "\\\\" in f:
+                    alt_paths.append(f.replace("\\\\", "\\"))  # Double backslash to single backslash
+                
+                found = False
+                for alt_path in alt_paths:
+                    if os.path.exists(alt_path):
+                        # Update to valid path
+                        tripinfo_files[i] = alt_path
+                        found = True
+                        cb.debug(f"Found alternative path: {alt_path}")
+                        break
+                
+                if not found:
+                    missing_files.append(f)
+                    cb.debug(f"File does not exist: {f}")
+                    cb.debug(f"None of the alternative paths exist")
     
     if missing_files:
         if ctx:
@@ -1269,14 +1833,14 @@ async def compare_simulation_results(
     os.makedirs(output_dir, exist_ok=True)
     
     # Build compare_and_draw.py script path
-    script_path = os.path.join(os.path.dirname(__file__), "tools", "compare_and_draw.py")
-    if not os.path.exists(script_path):
+    script_path = COMPARE_SCRIPT
+    if not script_path:
         if ctx:
-            ctx.error(f"Script not found: {script_path}")
-        return {"success": False, "message": f"Script not found: {script_path}"}
+            ctx.error(f"Script not found: compare_and_draw.py")
+        return {"success": False, "message": f"Script not found: compare_and_draw.py"}
     
     # Build command
-    cmd = ["python", script_path]
+    cmd = [sys.executable, script_path]
     for f in tripinfo_files:
         cmd.extend(["--results", f])
     for l in labels:
@@ -1293,15 +1857,7 @@ async def compare_simulation_results(
     
     try:
         # Execute command
-        process = subprocess.run(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True,
-            check=False,
-            timeout=300,  # 5 minutes timeout
-            shell=True
-        )
+        process = await run_process(cmd, timeout=300)  # 5 minutes timeout
         
         # Log output
         if ctx:
@@ -1359,7 +1915,6 @@ async def compare_simulation_results(
             "message": "Comparison script execution timed out"
         }
     except Exception as e:
-        import traceback
         if ctx:
             ctx.error(f"Comparison failed: {str(e)}")
             ctx.error(traceback.format_exc())
@@ -1371,6 +1926,31 @@ async def compare_simulation_results(
 # ────────────────────────────────────────────────────────────────────────────────
 # MCP Resources
 # ────────────────────────────────────────────────────────────────────────────────
+# Paths found by searching below a results directory, keyed by (results_dir, filename)
+_LOCATED_RESULTS: Dict[Tuple[str, str], str] = {}
+
+def _locate_result(results_dir: str, filename: str):
+    """Return the path of filename in results_dir or any subdirectory, or None if missing.
+    
+    Paths found by walking the directory are remembered and reused while they still exist.
+    """
+    direct_path = os.path.join(results_dir, filename)
+    if os.path.exists(direct_path):
+        return direct_path
+    
+    key = (os.path.abspath(results_dir), filename)
+    cached = _LOCATED_RESULTS.get(key)
+    if cached and os.path.exists(cached):
+        return cached
+    
+    # If not found, try to look in results directory
+    for root, dirs, files in os.walk(results_dir):
+        if filename in files:
+            found = os.path.join(root, filename)
+            _LOCATED_RESULTS[key] = found
+            return found
+    return None
+
 @mcp.resource("data://radar/{simulation_name}")
 def get_radar_chart(simulation_name: str) -> Image:
     """Provide radar chart resource for specified simulation.
@@ -1384,20 +1964,10 @@ def get_radar_chart(simulation_name: str) -> Image:
     # Find radar chart file path
     base_dir = os.path.join("data", "simulation", simulation_name)
     results_dir = os.path.join(base_dir, "results")
-    radar_path = os.path.join(results_dir, "comparison_radar.png")
-    
-    # If not found, try to look in results directory
-    if not os.path.exists(radar_path):
-        for root, dirs, files in os.walk(results_dir):
-            for file in files:
-                if file == "comparison_radar.png":
-                    radar_path = os.path.join(root, file)
-                    break
-            if os.path.exists(radar_path):
-                break
+    radar_path = _locate_result(results_dir, "comparison_radar.png")
     
     # If radar chart is found, read and return Image object
-    if os.path.exists(radar_path):
+    if radar_path:
         with open(radar_path, "rb") as f:
             data = f.read()
         return Image(data=data, format="png")
@@ -1418,34 +1988,20 @@ def get_metrics_data(simulation_name: str) -> dict:
     # Find metrics CSV file path
     base_dir = os.path.join("data", "simulation", simulation_name)
     results_dir = os.path.join(base_dir, "results")
-    metrics_path = os.path.join(results_dir, "comparison_metrics.csv")
-    
-    # If not found, try to look in results directory
-    if not os.path.exists(metrics_path):
-        for root, dirs, files in os.walk(results_dir):
-            for file in files:
-                if file == "comparison_metrics.csv":
-                    metrics_path = os.path.join(root, file)
-                    break
-            if os.path.exists(metrics_path):
-                break
+    metrics_path = _locate_result(results_dir, "comparison_metrics.csv")
     
     # If metrics file is found, read and process as dictionary
-    if os.path.exists(metrics_path):
-        import csv
-        headers = []
-        rows = []
-        with open(metrics_path, 'r', encoding='utf-8') as f:
-            reader = csv.reader(f)
-            for i, row in enumerate(reader):
-                if i == 0:  # Header row contains metric names
-                    headers = row[1:]  # Skip first column (empty column)
-                else:
-                    method_name = row[0]
-                    values = row[1:]
-                    # Convert to float
-                    values = [float(v) if v else 0.0 for v in values]
-                    rows.append({"method": method_name, "values": values})
+    if metrics_path:
+        # Blank lines are skipped and rows may differ in length, as in hand-edited files
+        with open(metrics_path, 'r', encoding='utf-8-sig', newline='') as f:
+            table = [row for row in csv.reader(f) if row]
+        if not table:
+            return {"metrics": [], "methods": [], "data": []}
+        
+        # Header row contains metric names, first column contains method names
+        headers = table[0][1:]
+        # Empty cells count as 0
+        rows = [{"method": row[0], "values": [float(v) if v else 0.0 for v in row[1:]]} for row in table[1:]]
         
         # Construct result
         result = {
@@ -1476,12 +2032,13 @@ def get_tripinfo(simulation_name: str, control_type: str) -> str:
     tripinfo_path = os.path.join(control_dir, "tripinfo.xml")
     
     # If trip information file is found, read and return content
-    if os.path.exists(tripinfo_path):
-        with open(tripinfo_path, 'r', encoding='utf-8') as f:
-            return f.read()
-    
-    # If trip information file is not found, return empty string
-    return ""
+    # Read raw bytes and decode once, skipping the text layer's newline translation
+    try:
+        with open(tripinfo_path, 'rb') as f:
+            return f.read().decode('utf-8')
+    except FileNotFoundError:
+        # If trip information file is not found, return empty string
+        return ""
 
 # ────────────────────────────────────────────────────────────────────────────────
 # Application entry
@@ -1,11 +1,14 @@
 import os
-os.environ["SUMO_HOME"] = "D:\Program Files\SUMO"
+import sys
+# 已设置的 SUMO_HOME 环境变量优先，仅在 Windows 上回退到默认安装路径
+if sys.platform == "win32":
+    os.environ.setdefault("SUMO_HOME", r"D:\Program Files\SUMO")
 from typing import Any, Dict, List
 
+import asyncio
 import importlib
-import subprocess
 import time
-from datetime import datetime
+import types
 from fastmcp import FastMCP, Context
 
 # ────────────────────────────────────────────────────────────────────────────────
@@ -15,7 +18,7 @@ mcp = FastMCP(name = "sumo_tools")
 
 # ==================== 子模块动态导入 ====================
 # 可用的子模块配置
-AVAILABLE_MODULES = {
+_RAW_MODULES = {
     "auxiliary": {
         "module_name": "auxiliary_tools",
         "server_var": "auxiliary_mcp", 
@@ -78,62 +81,135 @@ AVAILABLE_MODULES = {
     }
 }
 
-# 已挂载的模块记录
-mounted_modules = set()
+# 配置在运行期间不变：冻结为只读映射，工具列表转为元组
+AVAILABLE_MODULES = types.MappingProxyType({
+    mid: {**cfg, "tools": tuple(cfg["tools"])} for mid, cfg in _RAW_MODULES.items()
+})
+_ALL_MODULE_IDS = tuple(AVAILABLE_MODULES)
+
+# 已挂载的模块记录：按 AVAILABLE_MODULES 的顺序为每个模块分配一个二进制位
+_MODULE_INDEX = {mid: i for i, mid in enumerate(AVAILABLE_MODULES)}
+_mounted_mask = 0
+
+def _is_mounted(module_id: str) -> bool:
+    """检查模块是否已挂载"""
+    return bool(_mounted_mask & (1 << _MODULE_INDEX[module_id]))
+
+def _mounted_count() -> int:
+    """已挂载模块的数量"""
+    return bin(_mounted_mask).count("1")
+
+def _mounted_list() -> List[str]:
+    """已挂载模块的ID列表（按 AVAILABLE_MODULES 的顺序）"""
+    return [mid for mid, idx in _MODULE_INDEX.items() if _mounted_mask & (1 << idx)]
+
+# 模块的派生信息（工具名称、数量、类型等）在导入时计算一次，查询时只需叠加挂载状态
+_PRECOMPUTED = {
+    mid: {
+        "summary": c["description"].split(" - ", 1)[0],
+        "description": c["description"],
+        "tools": c["tools"],
+        "tools_count": len(c["tools"]),
+        "module_type": "modern" if "server_var" in c else "legacy",
+        "prefixed_tools": tuple(f"sumo_server-{mid}_{t}" for t in c["tools"]),
+        "tool_call_format": f"sumo_server-{mid}_{{tool_name}}",
+        "path_hint": c["module_name"].replace(".", "/") + ".py"
+    }
+    for mid, c in AVAILABLE_MODULES.items()
+}
+
+# 列表/状态查询的响应只随挂载状态变化，按 _mounted_mask 缓存 (mask, response)
+_list_cache = None
+_status_cache = None
 
 @mcp.tool()
 async def list_available_modules() -> Dict[str, Any]:
-    """列出所有可用的子模块及其状态
+    """列出所有可用的子模块及其挂载状态（精简摘要）
+    
+    需要完整的工具列表和调用名称时，请使用 describe_module()
+    
+    Returns:
+        包含模块摘要和挂载状态的字典
+    """
+    global _list_cache
+    
+    if _list_cache is not None and _list_cache[0] == _mounted_mask:
+        return _list_cache[1]
+    
+    modules_info = {}
+    for module_id, pre in _PRECOMPUTED.items():
+        modules_info[module_id] = {
+            "summary": pre["summary"],
+            "is_mounted": _is_mounted(module_id),
+            "tools_count": pre["tools_count"]
+        }
+    
+    result = {
+        "available_modules": modules_info,
+        "total_modules": len(AVAILABLE_MODULES),
+        "mounted_count": _mounted_count(),
+        "unmounted_count": len(AVAILABLE_MODULES) - _mounted_count()
+    }
+    _list_cache = (_mounted_mask, result)
+    return result
+
+@mcp.tool()
+async def describe_module(module_ids: List[str]) -> Dict[str, Any]:
+    """获取指定子模块的完整信息（工具列表、实际调用名称等）
+    
+    Args:
+        module_ids: 要查看的模块ID列表，例如 ["auxiliary", "detector"]
     
     Returns:
-        包含模块信息和挂载状态的字典
+        包含模块详细信息的字典
     """
+    if isinstance(module_ids, str):
+        module_ids = [module_ids]
+    
     modules_info = {}
-    for module_id, config in AVAILABLE_MODULES.items():
-        is_mounted = module_id in mounted_modules
+    unknown_modules = []
+    for module_id in module_ids:
+        pre = _PRECOMPUTED.get(module_id)
+        if pre is None:
+            unknown_modules.append(module_id)
+            continue
         
-        # 如果模块已挂载，生成实际的工具调用名称
-        actual_tool_names = []
-        if is_mounted:
-            actual_tool_names = [f"sumo_server-{module_id}_{tool}" for tool in config["tools"]]
+        is_mounted = _is_mounted(module_id)
         
+        # 如果模块已挂载，返回预先生成的实际工具调用名称
         modules_info[module_id] = {
-            "description": config["description"],
-            "tools": config["tools"],
-            "actual_tool_names": actual_tool_names if is_mounted else [],
+            "description": pre["description"],
+            "tools": pre["tools"],
+            "actual_tool_names": pre["prefixed_tools"] if is_mounted else (),
             "is_mounted": is_mounted,
             "mount_status": "已挂载" if is_mounted else "未挂载",
-            "tool_call_format": f"sumo_server-{module_id}_{{tool_name}}" if is_mounted else f"需要先挂载模块"
+            "tool_call_format": pre["tool_call_format"] if is_mounted else "需要先挂载模块"
         }
     
-    usage_instruction = """
-📋 工具调用说明:
-挂载模块后，工具调用格式为: sumo_server-{module_id}_{tool_name}
-例如:
-- auxiliary模块的osm_download_by_place工具 → sumo_server-auxiliary_osm_download_by_place
-- detector模块的convert_flow_to_edge_data工具 → sumo_server-detector_convert_flow_to_edge_data
-- xml模块的convert_csv_to_xml工具 → sumo_server-xml_convert_csv_to_xml
-"""
+    if unknown_modules:
+        return {
+            "success": False,
+            "message": f"以下模块不存在: {', '.join(unknown_modules)}",
+            "available_modules": _ALL_MODULE_IDS,
+            "modules": modules_info
+        }
     
     return {
-        "usage_instruction": usage_instruction,
-        "available_modules": modules_info,
-        "total_modules": len(AVAILABLE_MODULES),
-        "mounted_count": len(mounted_modules),
-        "unmounted_count": len(AVAILABLE_MODULES) - len(mounted_modules)
+        "success": True,
+        "modules": modules_info
     }
 
 @mcp.tool()
-async def mount_module(module_ids: List[str]) -> Dict[str, Any]:
+async def mount_module(module_ids: List[str], ctx: Context = None) -> Dict[str, Any]:
     """动态挂载子模块（支持单个或多个）
     
     Args:
         module_ids: 要挂载的模块ID列表，支持单个模块或多个模块
+        ctx: Context object for progress reporting
     
     Returns:
         挂载结果信息
     """
-    import importlib
     from datetime import datetime
     
     # 输入验证
@@ -154,13 +230,10 @@ async def mount_module(module_ids: List[str]) -> Dict[str, Any]:
             "error_type": "ValidationError"
         }
     
-    start_time = datetime.now()
-    results = []
-    success_count = 0
-    failed_count = 0
+    start_ns = time.perf_counter_ns()
     
-    def _mount_single_module(module_id: str) -> Dict[str, Any]:
-        """挂载单个模块的内部函数"""
+    def _check_module_id(module_id: str, requested: set) -> Dict[str, Any]:
+        """在导入前检查模块ID，返回错误信息；可以挂载时返回 None"""
         # 输入验证
         if not module_id or not isinstance(module_id, str):
             return {
@@ -173,22 +246,42 @@ async def mount_module(module_ids: List[str]) -> Dict[str, Any]:
             return {
                 "success": False,
                 "message": f"模块 '{module_id}' 不存在",
-                "available_modules": list(AVAILABLE_MODULES.keys()),
+                "available_modules": _ALL_MODULE_IDS,
                 "suggestion": f"请使用 list_available_modules() 查看所有可用模块"
             }
         
         # 检查是否已挂载
-        if module_id in mounted_modules:
+        if _is_mounted(module_id):
             return {
                 "success": False,
                 "message": f"模块 '{module_id}' 已经挂载，无法重复挂载",
-                "mounted_modules": list(mounted_modules)
+                "mounted_modules": _mounted_list()
             }
         
+        # 同一批次中重复出现的模块ID只导入一次
+        if module_id in requested:
+            return {
+                "success": False,
+                "message": f"模块 '{module_id}' 在本次请求中重复出现，已跳过",
+                "error_type": "ValidationError"
+            }
+        
+        return None
+    
+    def _failed_result(module_id: str, error: Dict[str, Any]) -> Dict[str, Any]:
+        """将错误信息包装为 details 中的一项"""
+        return {
+            "module_id": module_id,
+            "success": False,
+            "message": error["message"],
+            "details": error
+        }
+    
+    def _load_module_server(module_id: str) -> Dict[str, Any]:
+        """导入单个模块并取得其服务器对象（在线程池中执行，可并行）"""
         config = AVAILABLE_MODULES[module_id]
-        prefix = module_id  # FastMCP会自动添加下划线
         
-        module_start_time = datetime.now()
+        module_start_ns = time.perf_counter_ns()
         
         try:
             # 动态导入模块
@@ -203,7 +296,8 @@ async def mount_module(module_ids: List[str]) -> Dict[str, Any]:
                     "suggestion": "请检查 AVAILABLE_MODULES 配置中的模块定义"
                 }
                 
-            if not hasattr(module, config["server_var"]):
+            server = getattr(module, config["server_var"], None)
+            if server is None:
                 return {
                     "success": False,
                     "message": f"模块 '{module_id}' 中未找到服务器变量 '{config['server_var']}'",
@@ -211,39 +305,20 @@ async def mount_module(module_ids: List[str]) -> Dict[str, Any]:
                     "suggestion": f"请检查 {config['module_name']} 文件中是否定义了 {config['server_var']}"
                 }
             
-            server = getattr(module, config["server_var"])
-            
             # 验证服务器对象
-            if not hasattr(server, 'mount') and not hasattr(server, '_tools'):
+            tools_attr = getattr(server, '_tools', None)
+            if tools_attr is None and getattr(server, 'mount', None) is None:
                 return {
                     "success": False,
                     "message": f"'{config['server_var']}' 不是有效的FastMCP服务器对象",
                     "error_type": "ValidationError"
                 }
             
-            # 执行挂载
-            mcp.mount(server, prefix=prefix)
-            mounted_modules.add(module_id)
-            
-            # 统计工具数量
-            tools_count = len(server._tools) if hasattr(server, '_tools') else len(config.get("tools", []))
-            
-            module_end_time = datetime.now()
-            load_time = (module_end_time - module_start_time).total_seconds()
-        
             return {
-                "success": True, 
-                "message": f"成功挂载模块 '{module_id}'",
-                "module_info": {
-                    "id": module_id,
-                    "name": server.name,
-                    "prefix": prefix,
-                    "tools_count": tools_count,
-                    "tools": config["tools"],
-                    "description": config["description"],
-                    "load_time_seconds": round(load_time, 3),
-                    "mounted_at": module_end_time.isoformat()
-                }
+                "success": True,
+                "server": server,
+                "tools_attr": tools_attr,
+                "started_ns": module_start_ns
             }
                 
         except ImportError as e:
@@ -252,7 +327,7 @@ async def mount_module(module_ids: List[str]) -> Dict[str, Any]:
                 "message": f"导入模块 '{module_id}' 失败: {str(e)}",
                 "error_type": "ImportError",
                 "module_path": config["module_name"],
-                "suggestion": f"请检查模块文件 {config['module_name'].replace('.', '/')} 是否存在且语法正确"
+                "suggestion": f"请检查模块文件 {_PRECOMPUTED[module_id]['path_hint']} 是否存在且语法正确"
             }
         except AttributeError as e:
             return {
@@ -269,23 +344,95 @@ async def mount_module(module_ids: List[str]) -> Dict[str, Any]:
                 "suggestion": "这可能是一个系统级错误，请检查日志或联系开发者"
             }
     
-    # 处理每个模块
-    for module_id in module_ids:
-        result = _mount_single_module(module_id)
-        results.append({
-            "module_id": module_id,
-            "success": result["success"],
-            "message": result["message"],
-            "details": result.get("module_info") if result["success"] else result
-        })
+    def _mount_loaded_module(module_id: str, loaded: Dict[str, Any]) -> Dict[str, Any]:
+        """将已导入的服务器挂载到主服务器（在事件循环中串行执行），返回 details 中的一项"""
+        global _mounted_mask
         
-        if result["success"]:
-            success_count += 1
+        if not loaded["success"]:
+            error = loaded
+        # 并发的挂载请求可能已在导入期间挂载了同一模块，挂载前再检查一次
+        elif _is_mounted(module_id):
+            error = {
+                "success": False,
+                "message": f"模块 '{module_id}' 已经挂载，无法重复挂载",
+                "mounted_modules": _mounted_list()
+            }
         else:
-            failed_count += 1
+            config = AVAILABLE_MODULES[module_id]
+            prefix = module_id  # FastMCP会自动添加下划线
+            server = loaded["server"]
+            
+            try:
+                # 执行挂载
+                mcp.mount(server, prefix=prefix)
+                _mounted_mask |= 1 << _MODULE_INDEX[module_id]
+                
+                # 统计工具数量
+                tools_attr = loaded["tools_attr"]
+                tools_count = len(tools_attr) if tools_attr is not None else len(config.get("tools", []))
+                
+                load_time = (time.perf_counter_ns() - loaded["started_ns"]) / 1e9
+            
+                return {
+                    "module_id": module_id,
+                    "success": True, 
+                    "message": f"成功挂载模块 '{module_id}'",
+                    "details": {
+                        "id": module_id,
+                        "name": server.name,
+                        "prefix": prefix,
+                        "tools_count": tools_count,
+                        "tools": config["tools"],
+                        "description": config["description"],
+                        "load_time_seconds": round(load_time, 3),
+                        "mounted_at": datetime.now().isoformat()
+                    }
+                }
+                    
+            except Exception as e:
+                error = {
+                    "success": False,
+                    "message": f"挂载模块 '{module_id}' 时发生未预期的错误: {str(e)}",
+                    "error_type": type(e).__name__,
+                    "suggestion": "这可能是一个系统级错误，请检查日志或联系开发者"
+                }
+        
+        return _failed_result(module_id, error)
+    
+    async def _load_indexed(index: int, module_id: str):
+        return index, await asyncio.to_thread(_load_module_server, module_id)
+    
+    # 无效、未知、已挂载或重复的模块ID直接返回错误，不占用导入线程
+    results = [None] * len(module_ids)
+    pending = []
+    requested = set()
+    for index, module_id in enumerate(module_ids):
+        error = _check_module_id(module_id, requested)
+        if error is not None:
+            results[index] = _failed_result(module_id, error)
+        else:
+            requested.add(module_id)
+            pending.append(_load_indexed(index, module_id))
     
-    end_time = datetime.now()
-    total_time = (end_time - start_time).total_seconds()
+    # 模块导入在线程中并行执行，总耗时取决于最慢的模块；
+    # 每导入完成一个就立即挂载（不含await，在事件循环中串行执行）并报告进度
+    done = len(module_ids) - len(pending)
+    for next_loaded in asyncio.as_completed(pending):
+        index, loaded = await next_loaded
+        results[index] = _mount_loaded_module(module_ids[index], loaded)
+        done += 1
+        
+        if ctx:
+            await ctx.report_progress(
+                progress=done,
+                total=len(module_ids),
+                message=results[index]["message"]
+            )
+    
+    success_count = sum(1 for result in results if result["success"])
+    failed_count = len(results) - success_count
+    
+    total_time = (time.perf_counter_ns() - start_ns) / 1e9
     
     return {
         "success": failed_count == 0,
@@ -295,11 +442,11 @@ async def mount_module(module_ids: List[str]) -> Dict[str, Any]:
             "success_count": success_count,
             "failed_count": failed_count,
             "total_time_seconds": round(total_time, 3),
-            "completed_at": end_time.isoformat()
+            "completed_at": datetime.now().isoformat()
         },
         "details": results,
         "system_status": {
-            "total_mounted": len(mounted_modules),
+            "total_mounted": _mounted_count(),
             "available_modules": len(AVAILABLE_MODULES)
         }
     }
@@ -314,64 +461,64 @@ async def get_module_status(module_id: str = None) -> Dict[str, Any]:
     Returns:
         模块状态信息
     """
+    global _status_cache
+    
     if module_id:
         # 获取单个模块状态
         if module_id not in AVAILABLE_MODULES:
             return {
                 "success": False,
                 "message": f"模块 '{module_id}' 不存在",
-                "available_modules": list(AVAILABLE_MODULES.keys())
+                "available_modules": _ALL_MODULE_IDS
             }
         
-        config = AVAILABLE_MODULES[module_id]
-        is_mounted = module_id in mounted_modules
+        pre = _PRECOMPUTED[module_id]
+        is_mounted = _is_mounted(module_id)
         
         return {
             "success": True,
             "module_info": {
                 "id": module_id,
-                "description": config["description"],
-                "tools": config["tools"],
-                "tools_count": len(config["tools"]),
-                "module_type": "modern" if "server_var" in config else "legacy",
+                "description": pre["description"],
+                "tools": pre["tools"],
+                "tools_count": pre["tools_count"],
+                "module_type": pre["module_type"],
                 "is_mounted": is_mounted,
                 "status": "已挂载" if is_mounted else "未挂载"
             }
         }
     else:
         # 获取所有模块状态
+        if _status_cache is not None and _status_cache[0] == _mounted_mask:
+            return _status_cache[1]
+        
         modules_status = {}
-        for mid, config in AVAILABLE_MODULES.items():
-            is_mounted = mid in mounted_modules
+        for mid, pre in _PRECOMPUTED.items():
+            is_mounted = _is_mounted(mid)
             modules_status[mid] = {
-                "description": config["description"],
-                "tools_count": len(config["tools"]),
-                "module_type": "modern" if "server_var" in config else "legacy",
+                "description": pre["description"],
+                "tools_count": pre["tools_count"],
+                "module_type": pre["module_type"],
                 "is_mounted": is_mounted,
                 "status": "已挂载" if is_mounted else "未挂载"
             }
         
-        return {
+        result = {
             "success": True,
             "system_overview": {
                 "total_modules": len(AVAILABLE_MODULES),
-                "mounted_modules": len(mounted_modules),
-                "unmounted_modules": len(AVAILABLE_MODULES) - len(mounted_modules),
-                "mounted_list": list(mounted_modules),
-                "unmounted_list": [mid for mid in AVAILABLE_MODULES.keys() if mid not in mounted_modules]
+                "mounted_modules": _mounted_count(),
+                "unmounted_modules": len(AVAILABLE_MODULES) - _mounted_count(),
+                "mounted_list": _mounted_list(),
+                "unmounted_list": [mid for mid, idx in _MODULE_INDEX.items() if not _mounted_mask & (1 << idx)]
             },
             "modules_status": modules_status
         }
+        _status_cache = (_mounted_mask, result)
+        return result
 
-@mcp.prompt()
-def get_guidance() -> str:
-    """
-    SUMO工具使用指南 - 为LLM提供完整的使用说明
-    
-    Returns:
-        完整的SUMO工具使用指南
-    """
-    return """# SUMO工具使用指南
+# SUMO工具使用指南（提示词文本只构建一次）
+_GUIDANCE_TEXT = """# SUMO工具使用指南
 
 ## 🎯 核心原则
 1. **路径使用绝对路径** - 避免相对路径导致的错误
@@ -385,6 +532,11 @@ def get_guidance() -> str:
 list_available_modules()
 ```
 
+如需查看某个模块的完整工具列表和调用名称：
+```
+describe_module(["auxiliary", "detector"])
+```
+
 ### 第2步：根据任务需求，批量加载模块
 ```
 mount_module(["detector"])      # 流量检测、数据转换和分析
@@ -408,6 +560,9 @@ sumo_server-auxiliary_generate_random_trips(net_file="network.net.xml")
 sumo_server-auxiliary_run_simulation(net_file="network.net.xml", route_file="routes.rou.xml", control_type="webster")
 sumo_server-auxiliary_compare_simulation_results(tripinfo_files='["fixed/tripinfo.xml","webster/tripinfo.xml"]', labels='["固定配时","Webster优化"]')
 ```
+其他模块同理，例如:
+- detector模块的convert_flow_to_edge_data工具 → sumo_server-detector_convert_flow_to_edge_data
+- xml模块的convert_csv_to_xml工具 → sumo_server-xml_convert_csv_to_xml
 
 ## 🔧 各模块功能说明
 
@@ -451,14 +606,29 @@ sumo_server-auxiliary_compare_simulation_results(tripinfo_files='["fixed/tripinf
 
 记住：高效的模块管理是成功完成SUMO任务的关键！"""
 
+@mcp.prompt()
+def get_guidance() -> str:
+    """
+    SUMO工具使用指南 - 为LLM提供完整的使用说明
+    
+    Returns:
+        完整的SUMO工具使用指南
+    """
+    return _GUIDANCE_TEXT
+
 if __name__ == "__main__":
     # 启动组合MCP服务器Base Module
+    # 传输方式可通过 MCP_TRANSPORT 环境变量选择：sse（默认）、streamable-http、stdio
+    transport = os.environ.get("MCP_TRANSPORT", "sse")
     try:
-        mcp.run(
-            transport="sse",
-            host="127.0.0.1", 
-            port=8014
-        )
+        if transport == "stdio":
+            mcp.run(transport="stdio")
+        else:
+            mcp.run(
+                transport=transport,
+                host="127.0.0.1", 
+                port=8014
+            )
     except Exception as e:
         print(f"服务器启动失败: {str(e)}")
         print("尝试默认传输方法...")
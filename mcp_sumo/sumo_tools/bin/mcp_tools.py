@@ -4,23 +4,185 @@ SUMO二进制工具模块 - 独立的FastMCP服务器
 处理SUMO核心二进制工具的封装和调用功能
 """
 
+import asyncio
 import os
-import subprocess
-from typing import Dict, Any, List, Optional
+import shutil
+import sys
+from typing import Dict, Any, List, Optional, Tuple
 
 from fastmcp import FastMCP, Context
 
-# 设置环境变量
-os.environ["SUMO_HOME"] = "D:\Program Files\SUMO"
+# 作为 sumo_tools 的子模块导入时可直接使用共用辅助函数；直接运行本文件时先把包所在目录加入搜索路径
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from sumo_tools.subprocess_utils import run_command
+
+# 设置环境变量：已设置的 SUMO_HOME 优先，仅在 Windows 上回退到默认安装路径
+if sys.platform == "win32":
+    os.environ.setdefault("SUMO_HOME", r"D:\Program Files\SUMO")
+
+def _find_binary(name: str) -> str:
+    """解析SUMO程序的完整路径：PATH优先，其次是 SUMO_HOME/bin，最后是本目录附带的程序"""
+    found = shutil.which(name)
+    if found:
+        return found
+    search_dirs = [os.path.dirname(os.path.abspath(__file__))]
+    if os.environ.get("SUMO_HOME"):
+        search_dirs.insert(0, os.path.join(os.environ["SUMO_HOME"], "bin"))
+    for directory in search_dirs:
+        found = shutil.which(name, path=directory)
+        if found:
+            return found
+    # 找不到时保留程序名，由启动时的错误提示用户
+    return name
+
+# 程序路径在导入时解析一次，避免每次调用都搜索 PATH
+_NETCONVERT_EXE = _find_binary("netconvert")
+_NETGENERATE_EXE = _find_binary("netgenerate")
+_OD2TRIPS_EXE = _find_binary("od2trips")
 
 # ────────────────────────────────────────────────────────────────────────────────
 # 创建二进制工具服务器
 # ────────────────────────────────────────────────────────────────────────────────
 bin_mcp = FastMCP(name="SUMO_Bin_Tools")
 
+# ────────────────────────────────────────────────────────────────────────────────
+# 辅助函数: 根据参数表构建命令行
+# ────────────────────────────────────────────────────────────────────────────────
+# 参数表中每一项为 (参数名, 命令行选项, 类型)：
+#   flag - 参数为真时只添加选项
+#   str  - 参数非空时添加选项和值
+#   num  - 参数不为 None 时添加选项和转换为字符串的值
+#   list - 参数非空时添加选项和以逗号连接的值
+def _build_argv(binary: str, spec: tuple, args: Dict[str, Any]) -> List[str]:
+    """按参数表顺序将工具参数转换为命令行参数列表"""
+    cmd = [binary]
+    for name, flag, kind in spec:
+        value = args[name]
+        if kind == "num":
+            if value is not None:
+                cmd += (flag, f"{value}")
+        elif not value:
+            continue
+        elif kind == "flag":
+            cmd.append(flag)
+        elif kind == "list":
+            cmd += (flag, ",".join(value))
+        else:
+            cmd += (flag, value)
+    return cmd
+
+# ────────────────────────────────────────────────────────────────────────────────
+# 辅助函数: 检查输入文件
+# ────────────────────────────────────────────────────────────────────────────────
+async def _missing_inputs(args: Dict[str, Any], names: tuple) -> List[str]:
+    """并行检查输入文件是否存在（参数值可以是逗号分隔的多个文件），返回缺失的文件"""
+    paths = [path.strip() for name in names if args[name] for path in args[name].split(",")]
+    exists = await asyncio.gather(*(asyncio.to_thread(os.path.exists, path) for path in paths))
+    return [path for path, found in zip(paths, exists) if not found]
+
+# ────────────────────────────────────────────────────────────────────────────────
+# 辅助函数: 收集输出文件
+# ────────────────────────────────────────────────────────────────────────────────
+# 纯XML输出的文件后缀及其在结果中的键名
+_PLAIN_OUTPUT_FILES = (
+    (".nod.xml", "nodes_file"),
+    (".edg.xml", "edges_file"),
+    (".con.xml", "connections_file"),
+    (".typ.xml", "types_file")
+)
+
+def _existing_outputs(candidates: Dict[str, Optional[str]]) -> Dict[str, str]:
+    """返回已生成的输出文件 {结果键名: 文件路径}，跳过未指定或不存在的文件"""
+    return {key: path for key, path in candidates.items() if path and os.path.exists(path)}
+
+def _collect_plain_outputs(prefix: Optional[str]) -> Dict[str, str]:
+    """遍历一次输出目录，返回已生成的纯XML文件 {结果键名: 文件路径}"""
+    if not prefix:
+        return {}
+    base = os.path.basename(prefix)
+    try:
+        with os.scandir(os.path.dirname(prefix) or ".") as entries:
+            names = {entry.name for entry in entries if entry.name.startswith(base)}
+    except OSError:
+        return {}
+    return {key: prefix + suffix for suffix, key in _PLAIN_OUTPUT_FILES if base + suffix in names}
+
+# ────────────────────────────────────────────────────────────────────────────────
+# 共用的输出选项参数表
+# ────────────────────────────────────────────────────────────────────────────────
+# 三个工具都支持的通用输出选项
+_COMMON_OUTPUT_SPEC = (
+    ("write_license", "--write-license", "flag"),
+    ("output_prefix", "--output-prefix", "str"),
+    ("precision", "--precision", "num"),
+    ("precision_geo", "--precision.geo", "num"),
+    ("human_readable_time", "-H", "flag"),
+    ("output_file", "-o", "str")
+)
+
+# netconvert 和 netgenerate 共有的网络输出选项
+_NET_OUTPUT_SPEC = (
+    ("plain_output_prefix", "-p", "str"),
+    ("plain_output_lanes", "--plain-output.lanes", "flag"),
+    ("junctions_join_output", "--junctions.join-output", "str"),
+    ("prefix", "--prefix", "str"),
+    ("amitran_output", "--amitran-output", "str"),
+    ("matsim_output", "--matsim-output", "str"),
+    ("opendrive_output", "--opendrive-output", "str"),
+    ("dlr_navteq_output", "--dlr-navteq-output", "str"),
+    ("dlr_navteq_version", "--dlr-navteq.version", "str"),
+    ("dlr_navteq_precision", "--dlr-navteq.precision", "num"),
+    ("output_street_names", "--output.street-names", "flag"),
+    ("output_original_names", "--output.original-names", "flag"),
+    ("street_sign_output", "--street-sign-output", "str")
+)
+
 # ────────────────────────────────────────────────────────────────────────────────
 # TOOL 1: 网络转换器 (netconvert)
 # ────────────────────────────────────────────────────────────────────────────────
+_NETCONVERT_SPEC = (
+    # 输入选项
+    ("sumo_net_file", "-s", "str"),
+    ("node_files", "-n", "str"),
+    ("edge_files", "-e", "str"),
+    ("connection_files", "-x", "str"),
+    ("tllogic_files", "-i", "str"),
+    ("type_files", "-t", "str"),
+    ("ptstop_files", "--ptstop-files", "str"),
+    ("ptline_files", "--ptline-files", "str"),
+    ("polygon_files", "--polygon-files", "str"),
+    ("shapefile_prefix", "--shapefile-prefix", "str"),
+    ("dlr_navteq_prefix", "--dlr-navteq-prefix", "str"),
+    ("osm_files", "--osm-files", "str"),
+    ("opendrive_files", "--opendrive-files", "str"),
+    ("visum_file", "--visum-file", "str"),
+    ("vissim_file", "--vissim-file", "str"),
+    ("robocup_dir", "--robocup-dir", "str"),
+    ("matsim_files", "--matsim-files", "str"),
+    ("itsumo_files", "--itsumo-files", "str"),
+    ("heightmap_shapefiles", "--heightmap.shapefiles", "str"),
+    ("heightmap_geotiff", "--heightmap.geotiff", "str")
+) + _COMMON_OUTPUT_SPEC + _NET_OUTPUT_SPEC + (
+    ("ptstop_output", "--ptstop-output", "str"),
+    ("ptline_output", "--ptline-output", "str"),
+    ("ptline_clean_up", "--ptline-clean-up", "flag"),
+    ("parking_output", "--parking-output", "str"),
+    ("railway_topology_output", "--railway.topology.output", "str"),
+    ("polygon_output", "--polygon-output", "str"),
+    ("opendrive_output_straight_threshold", "--opendrive-output.straight-threshold", "num"),
+    ("opendrive_output_lefthand_left", "--opendrive-output.lefthand-left", "flag"),
+    ("opendrive_output_shape_match_dist", "--opendrive-output.shape-match-dist", "num")
+)
+
+# 启动前需要检查是否存在的输入文件参数
+_NETCONVERT_INPUTS = (
+    "sumo_net_file", "node_files", "edge_files", "connection_files", "tllogic_files",
+    "type_files", "ptstop_files", "ptline_files", "polygon_files", "osm_files",
+    "opendrive_files", "visum_file", "vissim_file", "matsim_files", "itsumo_files",
+    "heightmap_geotiff"
+)
+
 @bin_mcp.tool()
 async def netconvert(
         # 输入选项
@@ -133,142 +295,79 @@ async def netconvert(
         opendrive_output_shape_match_dist: 将加载的形状匹配到FLOAT范围内最近的边缘并导出为道路对象
         """
         
-        cmd = ["netconvert"]
-        
-        # 添加输入选项
-        if sumo_net_file:
-            cmd.extend(["-s", sumo_net_file])
-        if node_files:
-            cmd.extend(["-n", node_files])
-        if edge_files:
-            cmd.extend(["-e", edge_files])
-        if connection_files:
-            cmd.extend(["-x", connection_files])
-        if tllogic_files:
-            cmd.extend(["-i", tllogic_files])
-        if type_files:
-            cmd.extend(["-t", type_files])
-        if ptstop_files:
-            cmd.extend(["--ptstop-files", ptstop_files])
-        if ptline_files:
-            cmd.extend(["--ptline-files", ptline_files])
-        if polygon_files:
-            cmd.extend(["--polygon-files", polygon_files])
-        if shapefile_prefix:
-            cmd.extend(["--shapefile-prefix", shapefile_prefix])
-        if dlr_navteq_prefix:
-            cmd.extend(["--dlr-navteq-prefix", dlr_navteq_prefix])
-        if osm_files:
-            cmd.extend(["--osm-files", osm_files])
-        if opendrive_files:
-            cmd.extend(["--opendrive-files", opendrive_files])
-        if visum_file:
-            cmd.extend(["--visum-file", visum_file])
-        if vissim_file:
-            cmd.extend(["--vissim-file", vissim_file])
-        if robocup_dir:
-            cmd.extend(["--robocup-dir", robocup_dir])
-        if matsim_files:
-            cmd.extend(["--matsim-files", matsim_files])
-        if itsumo_files:
-            cmd.extend(["--itsumo-files", itsumo_files])
-        if heightmap_shapefiles:
-            cmd.extend(["--heightmap.shapefiles", heightmap_shapefiles])
-        if heightmap_geotiff:
-            cmd.extend(["--heightmap.geotiff", heightmap_geotiff])
-        
-        # 添加输出选项
-        if write_license:
-            cmd.append("--write-license")
-        if output_prefix:
-            cmd.extend(["--output-prefix", output_prefix])
-        if precision is not None:
-            cmd.extend(["--precision", str(precision)])
-        if precision_geo is not None:
-            cmd.extend(["--precision.geo", str(precision_geo)])
-        if human_readable_time:
-            cmd.append("-H")
-        if output_file:
-            cmd.extend(["-o", output_file])
-        if plain_output_prefix:
-            cmd.extend(["-p", plain_output_prefix])
-        if plain_output_lanes:
-            cmd.append("--plain-output.lanes")
-        if junctions_join_output:
-            cmd.extend(["--junctions.join-output", junctions_join_output])
-        if prefix:
-            cmd.extend(["--prefix", prefix])
-        if amitran_output:
-            cmd.extend(["--amitran-output", amitran_output])
-        if matsim_output:
-            cmd.extend(["--matsim-output", matsim_output])
-        if opendrive_output:
-            cmd.extend(["--opendrive-output", opendrive_output])
-        if dlr_navteq_output:
-            cmd.extend(["--dlr-navteq-output", dlr_navteq_output])
-        if dlr_navteq_version:
-            cmd.extend(["--dlr-navteq.version", dlr_navteq_version])
-        if dlr_navteq_precision is not None:
-            cmd.extend(["--dlr-navteq.precision", str(dlr_navteq_precision)])
-        if output_street_names:
-            cmd.append("--output.street-names")
-        if output_original_names:
-            cmd.append("--output.original-names")
-        if street_sign_output:
-            cmd.extend(["--street-sign-output", street_sign_output])
-        if ptstop_output:
-            cmd.extend(["--ptstop-output", ptstop_output])
-        if ptline_output:
-            cmd.extend(["--ptline-output", ptline_output])
-        if ptline_clean_up:
-            cmd.append("--ptline-clean-up")
-        if parking_output:
-            cmd.extend(["--parking-output", parking_output])
-        if railway_topology_output:
-            cmd.extend(["--railway.topology.output", railway_topology_output])
-        if polygon_output:
-            cmd.extend(["--polygon-output", polygon_output])
-        if opendrive_output_straight_threshold is not None:
-            cmd.extend(["--opendrive-output.straight-threshold", str(opendrive_output_straight_threshold)])
-        if opendrive_output_lefthand_left:
-            cmd.append("--opendrive-output.lefthand-left")
-        if opendrive_output_shape_match_dist is not None:
-            cmd.extend(["--opendrive-output.shape-match-dist", str(opendrive_output_shape_match_dist)])
+        args = locals()
+        missing = await _missing_inputs(args, _NETCONVERT_INPUTS)
+        if missing:
+            return {
+                "success": False,
+                "message": f"输入文件不存在: {', '.join(missing)}",
+                "missing_files": missing
+            }
+        
+        cmd = _build_argv(_NETCONVERT_EXE, _NETCONVERT_SPEC, args)
         
         if ctx:
             ctx.info(f"执行命令: {' '.join(cmd)}")
         
-        process = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        returncode, stdout, stderr = await run_command(cmd)
         
-        result = {
-            "success": process.returncode == 0,
-            "message": "网络转换成功" if process.returncode == 0 else "网络转换失败",
-            "stdout": process.stdout,
-            "stderr": process.stderr
+        return {
+            "success": returncode == 0,
+            "message": "网络转换成功" if returncode == 0 else "网络转换失败",
+            "stdout": stdout,
+            "stderr": stderr,
+            # 添加输出文件信息
+            **_existing_outputs({"output_file": output_file}),
+            **_collect_plain_outputs(plain_output_prefix)
         }
-        
-        # 添加输出文件信息
-        if output_file and os.path.exists(output_file):
-            result["output_file"] = output_file
-        if plain_output_prefix:
-            nodes_file = f"{plain_output_prefix}.nod.xml"
-            edges_file = f"{plain_output_prefix}.edg.xml"
-            connections_file = f"{plain_output_prefix}.con.xml"
-            types_file = f"{plain_output_prefix}.typ.xml"
-            if os.path.exists(nodes_file):
-                result["nodes_file"] = nodes_file
-            if os.path.exists(edges_file):
-                result["edges_file"] = edges_file
-            if os.path.exists(connections_file):
-                result["connections_file"] = connections_file
-            if os.path.exists(types_file):
-                result["types_file"] = types_file
-        
-        return result
 
 # ────────────────────────────────────────────────────────────────────────────────
 # TOOL 2: 网络生成器 (netgenerate)
 # ────────────────────────────────────────────────────────────────────────────────
+_NETGENERATE_SPEC = (
+    # 网格网络选项
+    ("grid", "-g", "flag"),
+    ("grid_number", "--grid.number", "num"),
+    ("grid_length", "--grid.length", "num"),
+    ("grid_x_number", "--grid.x-number", "num"),
+    ("grid_y_number", "--grid.y-number", "num"),
+    ("grid_x_length", "--grid.x-length", "num"),
+    ("grid_y_length", "--grid.y-length", "num"),
+    ("grid_attach_length", "--grid.attach-length", "num"),
+    ("grid_x_attach_length", "--grid.x-attach-length", "num"),
+    ("grid_y_attach_length", "--grid.y-attach-length", "num"),
+    # 蜘蛛网络选项
+    ("spider", "-s", "flag"),
+    ("spider_arm_number", "--spider.arm-number", "num"),
+    ("spider_circle_number", "--spider.circle-number", "num"),
+    ("spider_space_radius", "--spider.space-radius", "num"),
+    ("spider_omit_center", "--spider.omit-center", "flag"),
+    ("spider_attach_length", "--spider.attach-length", "num"),
+    # 随机网络选项
+    ("rand", "-r", "flag"),
+    ("rand_iterations", "--rand.iterations", "num"),
+    ("rand_max_distance", "--rand.max-distance", "num"),
+    ("rand_min_distance", "--rand.min-distance", "num"),
+    ("rand_min_angle", "--rand.min-angle", "num"),
+    ("rand_num_tries", "--rand.num-tries", "num"),
+    ("rand_connectivity", "--rand.connectivity", "num"),
+    ("rand_neighbor_dist1", "--rand.neighbor-dist1", "num"),
+    ("rand_neighbor_dist2", "--rand.neighbor-dist2", "num"),
+    ("rand_neighbor_dist3", "--rand.neighbor-dist3", "num"),
+    ("rand_neighbor_dist4", "--rand.neighbor-dist4", "num"),
+    ("rand_neighbor_dist5", "--rand.neighbor-dist5", "num"),
+    ("rand_neighbor_dist6", "--rand.neighbor-dist6", "num"),
+    ("rand_grid", "--rand.grid", "flag"),
+    # 输入选项
+    ("type_files", "-t", "str")
+) + _COMMON_OUTPUT_SPEC + (
+    ("alphanumerical_ids", "--alphanumerical-ids", "flag"),
+) + _NET_OUTPUT_SPEC + (
+    ("opendrive_output_straight_threshold", "--opendrive-output.straight-threshold", "num"),
+)
+
+_NETGENERATE_INPUTS = ("type_files",)
+
 @bin_mcp.tool()
 async def netgenerate(
         # 网格网络选项
@@ -401,159 +500,100 @@ async def netgenerate(
         opendrive_output_straight_threshold: 当直线段之间的角度变化超过FLOAT度时构建参数化曲线
         """
         
-        cmd = ["netgenerate"]
-        
-        # 添加网格网络选项
-        if grid:
-            cmd.append("-g")
-        if grid_number is not None:
-            cmd.extend(["--grid.number", str(grid_number)])
-        if grid_length is not None:
-            cmd.extend(["--grid.length", str(grid_length)])
-        if grid_x_number is not None:
-            cmd.extend(["--grid.x-number", str(grid_x_number)])
-        if grid_y_number is not None:
-            cmd.extend(["--grid.y-number", str(grid_y_number)])
-        if grid_x_length is not None:
-            cmd.extend(["--grid.x-length", str(grid_x_length)])
-        if grid_y_length is not None:
-            cmd.extend(["--grid.y-length", str(grid_y_length)])
-        if grid_attach_length is not None:
-            cmd.extend(["--grid.attach-length", str(grid_attach_length)])
-        if grid_x_attach_length is not None:
-            cmd.extend(["--grid.x-attach-length", str(grid_x_attach_length)])
-        if grid_y_attach_length is not None:
-            cmd.extend(["--grid.y-attach-length", str(grid_y_attach_length)])
-        
-        # 添加蜘蛛网络选项
-        if spider:
-            cmd.append("-s")
-        if spider_arm_number is not None:
-            cmd.extend(["--spider.arm-number", str(spider_arm_number)])
-        if spider_circle_number is not None:
-            cmd.extend(["--spider.circle-number", str(spider_circle_number)])
-        if spider_space_radius is not None:
-            cmd.extend(["--spider.space-radius", str(spider_space_radius)])
-        if spider_omit_center:
-            cmd.append("--spider.omit-center")
-        if spider_attach_length is not None:
-            cmd.extend(["--spider.attach-length", str(spider_attach_length)])
-        
-        # 添加随机网络选项
-        if rand:
-            cmd.append("-r")
-        if rand_iterations is not None:
-            cmd.extend(["--rand.iterations", str(rand_iterations)])
-        if rand_max_distance is not None:
-            cmd.extend(["--rand.max-distance", str(rand_max_distance)])
-        if rand_min_distance is not None:
-            cmd.extend(["--rand.min-distance", str(rand_min_distance)])
-        if rand_min_angle is not None:
-            cmd.extend(["--rand.min-angle", str(rand_min_angle)])
-        if rand_num_tries is not None:
-            cmd.extend(["--rand.num-tries", str(rand_num_tries)])
-        if rand_connectivity is not None:
-            cmd.extend(["--rand.connectivity", str(rand_connectivity)])
-        if rand_neighbor_dist1 is not None:
-            cmd.extend(["--rand.neighbor-dist1", str(rand_neighbor_dist1)])
-        if rand_neighbor_dist2 is not None:
-            cmd.extend(["--rand.neighbor-dist2", str(rand_neighbor_dist2)])
-        if rand_neighbor_dist3 is not None:
-            cmd.extend(["--rand.neighbor-dist3", str(rand_neighbor_dist3)])
-        if rand_neighbor_dist4 is not None:
-            cmd.extend(["--rand.neighbor-dist4", str(rand_neighbor_dist4)])
-        if rand_neighbor_dist5 is not None:
-            cmd.extend(["--rand.neighbor-dist5", str(rand_neighbor_dist5)])
-        if rand_neighbor_dist6 is not None:
-            cmd.extend(["--rand.neighbor-dist6", str(rand_neighbor_dist6)])
-        if rand_grid:
-            cmd.append("--rand.grid")
-        
-        # 添加输入选项
-        if type_files:
-            cmd.extend(["-t", type_files])
-        
-        # 添加输出选项
-        if write_license:
-            cmd.append("--write-license")
-        if output_prefix:
-            cmd.extend(["--output-prefix", output_prefix])
-        if precision is not None:
-            cmd.extend(["--precision", str(precision)])
-        if precision_geo is not None:
-            cmd.extend(["--precision.geo", str(precision_geo)])
-        if human_readable_time:
-            cmd.append("-H")
-        if alphanumerical_ids:
-            cmd.append("--alphanumerical-ids")
-        if output_file:
-            cmd.extend(["-o", output_file])
-        if plain_output_prefix:
-            cmd.extend(["-p", plain_output_prefix])
-        if plain_output_lanes:
-            cmd.append("--plain-output.lanes")
-        if junctions_join_output:
-            cmd.extend(["--junctions.join-output", junctions_join_output])
-        if prefix:
-            cmd.extend(["--prefix", prefix])
-        if amitran_output:
-            cmd.extend(["--amitran-output", amitran_output])
-        if matsim_output:
-            cmd.extend(["--matsim-output", matsim_output])
-        if opendrive_output:
-            cmd.extend(["--opendrive-output", opendrive_output])
-        if dlr_navteq_output:
-            cmd.extend(["--dlr-navteq-output", dlr_navteq_output])
-        if dlr_navteq_version:
-            cmd.extend(["--dlr-navteq.version", dlr_navteq_version])
-        if dlr_navteq_precision is not None:
-            cmd.extend(["--dlr-navteq.precision", str(dlr_navteq_precision)])
-        if output_street_names:
-            cmd.append("--output.street-names")
-        if output_original_names:
-            cmd.append("--output.original-names")
-        if street_sign_output:
-            cmd.extend(["--street-sign-output", street_sign_output])
-        if opendrive_output_straight_threshold is not None:
-            cmd.extend(["--opendrive-output.straight-threshold", str(opendrive_output_straight_threshold)])
+        args = locals()
+        missing = await _missing_inputs(args, _NETGENERATE_INPUTS)
+        if missing:
+            return {
+                "success": False,
+                "message": f"输入文件不存在: {', '.join(missing)}",
+                "missing_files": missing
+            }
         
+        cmd = _build_argv(_NETGENERATE_EXE, _NETGENERATE_SPEC, args)
         cmd.extend(["--tls.guess", "true"])
         cmd.extend(["--tls.guess.threshold", "10"])
 
         if ctx:
             ctx.info(f"执行命令: {' '.join(cmd)}")
         
-        process = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        returncode, stdout, stderr = await run_command(cmd)
         
-        result = {
-            "success": process.returncode == 0,
-            "message": "网络生成成功" if process.returncode == 0 else "网络生成失败",
-            "stdout": process.stdout,
-            "stderr": process.stderr
+        return {
+            "success": returncode == 0,
+            "message": "网络生成成功" if returncode == 0 else "网络生成失败",
+            "stdout": stdout,
+            "stderr": stderr,
+            # 添加输出文件信息
+            **_existing_outputs({"output_file": output_file}),
+            **_collect_plain_outputs(plain_output_prefix)
         }
-        
-        # 添加输出文件信息
-        if output_file and os.path.exists(output_file):
-            result["output_file"] = output_file
-        if plain_output_prefix:
-            nodes_file = f"{plain_output_prefix}.nod.xml"
-            edges_file = f"{plain_output_prefix}.edg.xml"
-            connections_file = f"{plain_output_prefix}.con.xml"
-            types_file = f"{plain_output_prefix}.typ.xml"
-            if os.path.exists(nodes_file):
-                result["nodes_file"] = nodes_file
-            if os.path.exists(edges_file):
-                result["edges_file"] = edges_file
-            if os.path.exists(connections_file):
-                result["connections_file"] = connections_file
-            if os.path.exists(types_file):
-                result["types_file"] = types_file
-        
-        return result
 
 # ────────────────────────────────────────────────────────────────────────────────
 # TOOL 3: OD矩阵转行程 (od2trips)
 # ────────────────────────────────────────────────────────────────────────────────
+_OD2TRIPS_SPEC = (
+    # 配置选项
+    ("configuration_file", "-c", "str"),
+    ("save_configuration", "-C", "str"),
+    ("save_configuration_relative", "--save-configuration.relative", "flag"),
+    ("save_template", "--save-template", "str"),
+    ("save_schema", "--save-schema", "str"),
+    ("save_commented", "--save-commented", "flag"),
+    # 输入选项
+    ("taz_files", "-n", "str"),
+    ("od_matrix_files", "-d", "str"),
+    ("od_amitran_files", "--od-amitran-files", "str"),
+    ("tazrelation_files", "-z", "str")
+) + _COMMON_OUTPUT_SPEC + (
+    # 输出选项
+    ("flow_output", "--flow-output", "str"),
+    ("flow_output_probability", "--flow-output.probability", "flag"),
+    ("pedestrians", "--pedestrians", "flag"),
+    ("persontrips", "--persontrips", "flag"),
+    ("persontrips_modes", "--persontrips.modes", "list"),
+    ("ignore_vehicle_type", "--ignore-vehicle-type", "flag"),
+    ("junctions", "--junctions", "flag"),
+    # 时间选项
+    ("begin", "-b", "str"),
+    ("end", "-e", "str"),
+    # 处理选项
+    ("scale", "-s", "num"),
+    ("spread_uniform", "--spread.uniform", "flag"),
+    ("different_source_sink", "--different-source-sink", "flag"),
+    ("vtype", "--vtype", "str"),
+    ("prefix", "--prefix", "str"),
+    ("timeline", "--timeline", "list"),
+    ("timeline_day_in_hours", "--timeline.day-in-hours", "flag"),
+    ("no_step_log", "--no-step-log", "flag"),
+    # 默认选项
+    ("departlane", "--departlane", "str"),
+    ("departpos", "--departpos", "str"),
+    ("departspeed", "--departspeed", "str"),
+    ("arrivallane", "--arrivallane", "str"),
+    ("arrivalpos", "--arrivalpos", "str"),
+    ("arrivalspeed", "--arrivalspeed", "str"),
+    # 报告选项
+    ("verbose", "-v", "flag"),
+    ("print_options", "--print-options", "flag"),
+    ("xml_validation", "-X", "str"),
+    ("no_warnings", "-W", "flag"),
+    ("aggregate_warnings", "--aggregate-warnings", "num"),
+    ("log", "-l", "str"),
+    ("message_log", "--message-log", "str"),
+    ("error_log", "--error-log", "str"),
+    ("log_timestamps", "--log.timestamps", "flag"),
+    ("log_processid", "--log.processid", "flag"),
+    ("language", "--language", "str"),
+    ("ignore_errors", "--ignore-errors", "flag"),
+    # 随机数选项
+    ("random", "--random", "flag"),
+    ("seed", "--seed", "num")
+)
+
+_OD2TRIPS_INPUTS = (
+    "configuration_file", "taz_files", "od_matrix_files", "od_amitran_files", "tazrelation_files"
+)
+
 @bin_mcp.tool()
 async def od2trips(
         # 配置选项
@@ -702,244 +742,139 @@ async def od2trips(
         seed: 使用给定值初始化随机数生成器
         """
         
-        cmd = ["od2trips"]
-        
-        # 添加配置选项
-        if configuration_file:
-            cmd.extend(["-c", configuration_file])
-        if save_configuration:
-            cmd.extend(["-C", save_configuration])
-        if save_configuration_relative:
-            cmd.append("--save-configuration.relative")
-        if save_template:
-            cmd.extend(["--save-template", save_template])
-        if save_schema:
-            cmd.extend(["--save-schema", save_schema])
-        if save_commented:
-            cmd.append("--save-commented")
-        
-        # 添加输入选项
-        if taz_files:
-            cmd.extend(["-n", taz_files])
-        if od_matrix_files:
-            cmd.extend(["-d", od_matrix_files])
-        if od_amitran_files:
-            cmd.extend(["--od-amitran-files", od_amitran_files])
-        if tazrelation_files:
-            cmd.extend(["-z", tazrelation_files])
+        args = locals()
+        missing = await _missing_inputs(args, _OD2TRIPS_INPUTS)
+        if missing:
+            return {
+                "success": False,
+                "message": f"输入文件不存在: {', '.join(missing)}",
+                "missing_files": missing
+            }
+        
+        cmd = _build_argv(_OD2TRIPS_EXE, _OD2TRIPS_SPEC, args)
+        # count 为默认属性，无需传递
         if tazrelation_attribute and tazrelation_attribute != "count":
             cmd.extend(["--tazrelation-attribute", tazrelation_attribute])
         
-        # 添加输出选项
-        if write_license:
-            cmd.append("--write-license")
-        if output_prefix:
-            cmd.extend(["--output-prefix", output_prefix])
-        if precision is not None:
-            cmd.extend(["--precision", str(precision)])
-        if precision_geo is not None:
-            cmd.extend(["--precision.geo", str(precision_geo)])
-        if human_readable_time:
-            cmd.append("-H")
-        if output_file:
-            cmd.extend(["-o", output_file])
-        if flow_output:
-            cmd.extend(["--flow-output", flow_output])
-        if flow_output_probability:
-            cmd.append("--flow-output.probability")
-        if pedestrians:
-            cmd.append("--pedestrians")
-        if persontrips:
-            cmd.append("--persontrips")
-        if persontrips_modes:
-            cmd.extend(["--persontrips.modes", ",".join(persontrips_modes)])
-        if ignore_vehicle_type:
-            cmd.append("--ignore-vehicle-type")
-        if junctions:
-            cmd.append("--junctions")
-        
-        # 添加时间选项
-        if begin:
-            cmd.extend(["-b", begin])
-        if end:
-            cmd.extend(["-e", end])
-        
-        # 添加处理选项
-        if scale is not None:
-            cmd.extend(["-s", str(scale)])
-        if spread_uniform:
-            cmd.append("--spread.uniform")
-        if different_source_sink:
-            cmd.append("--different-source-sink")
-        if vtype:
-            cmd.extend(["--vtype", vtype])
-        if prefix:
-            cmd.extend(["--prefix", prefix])
-        if timeline:
-            cmd.extend(["--timeline", ",".join(timeline)])
-        if timeline_day_in_hours:
-            cmd.append("--timeline.day-in-hours")
-        if no_step_log:
-            cmd.append("--no-step-log")
-        
-        # 添加默认选项
-        if departlane:
-            cmd.extend(["--departlane", departlane])
-        if departpos:
-            cmd.extend(["--departpos", departpos])
-        if departspeed:
-            cmd.extend(["--departspeed", departspeed])
-        if arrivallane:
-            cmd.extend(["--arrivallane", arrivallane])
-        if arrivalpos:
-            cmd.extend(["--arrivalpos", arrivalpos])
-        if arrivalspeed:
-            cmd.extend(["--arrivalspeed", arrivalspeed])
-        
-        # 添加报告选项
-        if verbose:
-            cmd.append("-v")
-        if print_options:
-            cmd.append("--print-options")
-        if xml_validation:
-            cmd.extend(["-X", xml_validation])
-        if no_warnings:
-            cmd.append("-W")
-        if aggregate_warnings is not None:
-            cmd.extend(["--aggregate-warnings", str(aggregate_warnings)])
-        if log:
-            cmd.extend(["-l", log])
-        if message_log:
-            cmd.extend(["--message-log", message_log])
-        if error_log:
-            cmd.extend(["--error-log", error_log])
-        if log_timestamps:
-            cmd.append("--log.timestamps")
-        if log_processid:
-            cmd.append("--log.processid")
-        if language:
-            cmd.extend(["--language", language])
-        if ignore_errors:
-            cmd.append("--ignore-errors")
-        
-        # 添加随机数选项
-        if random:
-            cmd.append("--random")
-        if seed is not None:
-            cmd.extend(["--seed", str(seed)])
-        
         if ctx:
             ctx.info(f"执行命令: {' '.join(cmd)}")
         
-        process = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        
-        result = {
-            "success": process.returncode == 0,
-            "message": "OD矩阵转换成功" if process.returncode == 0 else "OD矩阵转换失败",
-            "stdout": process.stdout,
-            "stderr": process.stderr
+        # 消息已写入日志文件时，不再重复捕获对应的输出流
+        stdout_log = log or message_log
+        stderr_log = log or error_log
+        returncode, stdout, stderr = await run_command(
+            cmd,
+            capture_stdout=not stdout_log,
+            capture_stderr=not stderr_log
+        )
+        
+        return {
+            "success": returncode == 0,
+            "message": "OD矩阵转换成功" if returncode == 0 else "OD矩阵转换失败",
+            "stdout": f"输出已写入日志文件: {stdout_log}" if stdout_log else stdout,
+            "stderr": f"输出已写入日志文件: {stderr_log}" if stderr_log else stderr,
+            # 添加输出文件信息
+            **_existing_outputs({"output_file": output_file, "flow_output": flow_output})
         }
-        
-        # 添加输出文件信息
-        if output_file and os.path.exists(output_file):
-            result["output_file"] = output_file
-        if flow_output and os.path.exists(flow_output):
-            result["flow_output"] = flow_output
-        
-        return result
 
 # ────────────────────────────────────────────────────────────────────────────────
 # 二进制工具资源
 # ────────────────────────────────────────────────────────────────────────────────
+_BIN_CONFIG = {
+    "version": "1.0.0",
+    "name": "SUMO Binary Tools",
+    "description": "SUMO核心二进制工具包，提供网络转换、网络生成和OD矩阵处理功能",
+    "tools": [
+        "netconvert",
+        "netgenerate", 
+        "od2trips"
+    ],
+    "core_binaries": [
+        "netconvert.exe - 网络格式转换工具",
+        "netgenerate.exe - 网络生成工具",
+        "od2trips.exe - OD矩阵转行程工具"
+    ],
+    "supported_formats": [
+        "OpenStreetMap (OSM)",
+        "OpenDRIVE",
+        "SUMO网络格式",
+        "Shapefile",
+        "Visum",
+        "Vissim",
+        "MATSim",
+        "NavTeq"
+    ],
+    "capabilities": [
+        "多格式网络导入导出",
+        "网络拓扑生成",
+        "交通需求处理",
+        "坐标系转换",
+        "网络验证和修复"
+    ]
+}
+
 @bin_mcp.resource("data://bin/config")
 def get_bin_config() -> Dict[str, Any]:
     """获取二进制工具配置信息"""
-    return {
-        "version": "1.0.0",
-        "name": "SUMO Binary Tools",
-        "description": "SUMO核心二进制工具包，提供网络转换、网络生成和OD矩阵处理功能",
-        "tools": [
-            "netconvert",
-            "netgenerate", 
-            "od2trips"
-        ],
-        "core_binaries": [
-            "netconvert.exe - 网络格式转换工具",
-            "netgenerate.exe - 网络生成工具",
-            "od2trips.exe - OD矩阵转行程工具"
-        ],
-        "supported_formats": [
-            "OpenStreetMap (OSM)",
-            "OpenDRIVE",
-            "SUMO网络格式",
-            "Shapefile",
-            "Visum",
-            "Vissim",
-            "MATSim",
-            "NavTeq"
-        ],
-        "capabilities": [
-            "多格式网络导入导出",
-            "网络拓扑生成",
-            "交通需求处理",
-            "坐标系转换",
-            "网络验证和修复"
-        ]
-    }
+    return _BIN_CONFIG
+
+_BIN_HELP = {
+    "netconvert": "SUMO网络转换工具，支持多种格式间的网络数据转换，包括OSM、OpenDRIVE、Shapefile等格式的导入导出",
+    "netgenerate": "SUMO网络生成工具，可以生成各种拓扑结构的道路网络，包括网格、随机、蜘蛛网等类型",
+    "od2trips": "OD矩阵转行程工具，将起点-终点(Origin-Destination)矩阵转换为具体的车辆行程定义"
+}
 
 @bin_mcp.resource("data://bin/help")
 def get_bin_help() -> Dict[str, str]:
     """获取二进制工具帮助信息"""
-    return {
-        "netconvert": "SUMO网络转换工具，支持多种格式间的网络数据转换，包括OSM、OpenDRIVE、Shapefile等格式的导入导出",
-        "netgenerate": "SUMO网络生成工具，可以生成各种拓扑结构的道路网络，包括网格、随机、蜘蛛网等类型",
-        "od2trips": "OD矩阵转行程工具，将起点-终点(Origin-Destination)矩阵转换为具体的车辆行程定义"
+    return _BIN_HELP
+
+_BIN_EXAMPLES = {
+    "osm_import": {
+        "description": "从OpenStreetMap导入网络",
+        "tool": "netconvert",
+        "parameters": {
+            "osm_files": "map.osm",
+            "output_file": "network.net.xml",
+            "geometry_remove": True,
+            "roundabouts_guess": True
+        }
+    },
+    "grid_network": {
+        "description": "生成网格状道路网络",
+        "tool": "netgenerate",
+        "parameters": {
+            "grid": True,
+            "grid_number": 5,
+            "grid_length": 200,
+            "output_file": "grid_network.net.xml"
+        }
+    },
+    "od_conversion": {
+        "description": "OD矩阵转换为行程",
+        "tool": "od2trips",
+        "parameters": {
+            "od_matrix_files": "od_matrix.xml",
+            "output_file": "trips.trips.xml",
+            "scale": 1.0,
+            "spread": 3600
+        }
+    },
+    "opendrive_import": {
+        "description": "从OpenDRIVE导入高精度地图",
+        "tool": "netconvert",
+        "parameters": {
+            "opendrive_files": "highway.xodr",
+            "output_file": "highway.net.xml",
+            "opendrive_ignore_widths": False
+        }
     }
+}
 
 @bin_mcp.resource("data://bin/examples")
 def get_bin_examples() -> Dict[str, Any]:
     """获取二进制工具使用示例"""
-    return {
-        "osm_import": {
-            "description": "从OpenStreetMap导入网络",
-            "tool": "netconvert",
-            "parameters": {
-                "osm_files": "map.osm",
-                "output_file": "network.net.xml",
-                "geometry_remove": True,
-                "roundabouts_guess": True
-            }
-        },
-        "grid_network": {
-            "description": "生成网格状道路网络",
-            "tool": "netgenerate",
-            "parameters": {
-                "grid": True,
-                "grid_number": 5,
-                "grid_length": 200,
-                "output_file": "grid_network.net.xml"
-            }
-        },
-        "od_conversion": {
-            "description": "OD矩阵转换为行程",
-            "tool": "od2trips",
-            "parameters": {
-                "od_matrix_files": "od_matrix.xml",
-                "output_file": "trips.trips.xml",
-                "scale": 1.0,
-                "spread": 3600
-            }
-        },
-        "opendrive_import": {
-            "description": "从OpenDRIVE导入高精度地图",
-            "tool": "netconvert",
-            "parameters": {
-                "opendrive_files": "highway.xodr",
-                "output_file": "highway.net.xml",
-                "opendrive_ignore_widths": False
-            }
-        }
-    }
+    return _BIN_EXAMPLES
 
 # 如果直接运行此文件，启动二进制工具服务器
 if __name__ == "__main__":
@@ -4,24 +4,97 @@ SUMO检测器工具模块 - 独立的FastMCP服务器
 处理交通流量检测、数据转换和分析功能
 """
 
+import asyncio
 import os
-import subprocess
+import sys
+import time
 import traceback
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 
 from fastmcp import FastMCP, Context
+from pydantic import BaseModel, ConfigDict
 
-# 设置环境变量
-os.environ["SUMO_HOME"] = "D:\Program Files\SUMO"
+# 作为 sumo_tools 的子模块导入时可直接使用共用辅助函数；直接运行本文件时先把包所在目录加入搜索路径
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from sumo_tools.subprocess_utils import run_command
+
+# 设置环境变量：已设置的 SUMO_HOME 优先，仅在 Windows 上回退到默认安装路径
+if sys.platform == "win32":
+    os.environ.setdefault("SUMO_HOME", r"D:\Program Files\SUMO")
+
+# SUMO 检测器脚本路径，在导入时解析一次
+_SUMO_DETECTOR_TOOLS = os.path.join(os.environ.get("SUMO_HOME", ""), "tools", "detector")
+_EDGE_DATA_FROM_FLOW = os.path.join(_SUMO_DETECTOR_TOOLS, "edgeDataFromFlow.py")
+_FLOW_FROM_EDGE_DATA = os.path.join(_SUMO_DETECTOR_TOOLS, "flowFromEdgeData.py")
+_MAP_DETECTORS = os.path.join(_SUMO_DETECTOR_TOOLS, "mapDetectors.py")
+_AGGREGATE_FLOWS = os.path.join(_SUMO_DETECTOR_TOOLS, "aggregateFlows.py")
 
 # ────────────────────────────────────────────────────────────────────────────────
 # 创建检测器工具服务器
 # ────────────────────────────────────────────────────────────────────────────────
 detector_mcp = FastMCP(name="SUMO_Detector_Tools")
 
+# ────────────────────────────────────────────────────────────────────────────────
+# 辅助函数: 带TTL的文件存在性缓存
+# ────────────────────────────────────────────────────────────────────────────────
+# 只缓存"存在"的结果：文件可能随时由其他模块生成，不存在的结果必须每次重新检查
+_EXISTS_TTL = 2.0
+_exists_cache: Dict[str, float] = {}
+
+def cached_exists(path: str) -> bool:
+    """检查输入文件是否存在，存在的结果在 _EXISTS_TTL 秒内复用"""
+    now = time.monotonic()
+    checked = _exists_cache.get(path)
+    if checked is not None and now - checked < _EXISTS_TTL:
+        return True
+    if os.path.exists(path):
+        _exists_cache[path] = now
+        return True
+    _exists_cache.pop(path, None)
+    return False
+
+# ────────────────────────────────────────────────────────────────────────────────
+# 辅助函数: 根据参数表构建命令行
+# ────────────────────────────────────────────────────────────────────────────────
+# 参数表中每一项为 (参数名, 命令行选项, 类型)：
+#   flag - 参数为真时只添加选项
+#   str  - 参数非空时添加选项和值
+#   num  - 参数不为 None 时添加选项和转换为字符串的值
+#   each - 对列表中的每个值重复添加选项和值
+def _build_argv(script: str, spec: tuple, args: Dict[str, Any]) -> List[str]:
+    """按参数表顺序将工具参数转换为 python 脚本的命令行参数列表"""
+    cmd = ["python", script]
+    for name, flag, kind in spec:
+        value = args[name]
+        if kind == "num":
+            if value is not None:
+                cmd += (flag, f"{value}")
+        elif not value:
+            continue
+        elif kind == "flag":
+            cmd.append(flag)
+        elif kind == "each":
+            for item in value:
+                cmd += (flag, item)
+        else:
+            cmd += (flag, value)
+    return cmd
+
 # ────────────────────────────────────────────────────────────────────────────────
 # TOOL 1: 流量数据转换为边缘数据
 # ────────────────────────────────────────────────────────────────────────────────
+_FLOW_TO_EDGE_DATA_SPEC = (
+    ("flow_file", "-f", "str"),
+    ("output_file", "-o", "str"),
+    ("flow_columns", "--flow-columns", "str"),
+    ("begin_time", "--begin", "num"),
+    ("end_time", "--end", "num"),
+    ("interval", "--interval", "num"),
+    ("detector_file", "-d", "str"),
+    ("cadyts_format", "--cadyts", "flag")
+)
+
 @detector_mcp.tool()
 async def convert_flow_to_edge_data(
     flow_file: str,
@@ -50,59 +123,39 @@ async def convert_flow_to_edge_data(
     cadyts_format: 是否生成cadyts格式的输出
     """
     
-    if not os.path.exists(flow_file):
+    if not cached_exists(flow_file):
         if ctx:
             ctx.error(f"流量文件不存在: {flow_file}")
         return {"success": False, "message": f"流量文件不存在: {flow_file}"}
     
-    if detector_file and not os.path.exists(detector_file):
+    if detector_file and not cached_exists(detector_file):
         if ctx:
             ctx.error(f"检测器文件不存在: {detector_file}")
         return {"success": False, "message": f"检测器文件不存在: {detector_file}"}
     
     # 确保输出目录存在
     output_dir = os.path.dirname(output_file)
-    if output_dir and not os.path.exists(output_dir):
+    if output_dir:
         os.makedirs(output_dir, exist_ok=True)
     
     # 构建命令
-    cmd = [
-        "python",
-        os.path.join(os.environ.get("SUMO_HOME", ""), "tools", "detector", "edgeDataFromFlow.py"),
-        "-f", flow_file,
-        "-o", output_file,
-        "--flow-columns", flow_columns,
-        "--begin", str(begin_time),
-        "--end", str(end_time),
-        "--interval", str(interval)
-    ]
-    
-    if detector_file:
-        cmd.extend(["-d", detector_file])
-    if cadyts_format:
-        cmd.append("--cadyts")
+    cmd = _build_argv(_EDGE_DATA_FROM_FLOW, _FLOW_TO_EDGE_DATA_SPEC, locals())
     
     if ctx:
         ctx.info(f"执行命令: {' '.join(cmd)}")
     
     try:
-        process = subprocess.run(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            check=False
-        )
+        returncode, stdout, stderr = await run_command(cmd)
         
         result = {
-            "success": process.returncode == 0,
-            "message": "流量数据转换成功" if process.returncode == 0 else "流量数据转换失败",
-            "stdout": process.stdout,
-            "stderr": process.stderr,
+            "success": returncode == 0,
+            "message": "流量数据转换成功" if returncode == 0 else "流量数据转换失败",
+            "stdout": stdout,
+            "stderr": stderr,
             "command": " ".join(cmd)
         }
         
-        if process.returncode == 0 and os.path.exists(output_file):
+        if returncode == 0 and os.path.exists(output_file):
             result["output_file"] = output_file
             result["file_size"] = os.path.getsize(output_file)
         
@@ -120,6 +173,21 @@ async def convert_flow_to_edge_data(
 # ────────────────────────────────────────────────────────────────────────────────
 # TOOL 2: 边缘数据转换为流量数据
 # ────────────────────────────────────────────────────────────────────────────────
+_EDGE_DATA_TO_FLOW_SPEC = (
+    ("edge_data_file", "-e", "str"),
+    ("detector_file", "-d", "str"),
+    ("output_file", "-o", "str"),
+    ("flow_column", "--flow-column", "str"),
+    ("interval", "--interval", "num"),
+    ("begin_time", "--begin", "num"),
+    ("end_time", "--end", "num"),
+    ("flow_output_file", "--flow-output", "str"),
+    ("detector_flow_file", "--detector-flow-file", "str"),
+    ("respect_zero", "--respect-zero", "flag"),
+    ("long_names", "--long-names", "flag"),
+    ("edge_names", "--edge-names", "flag")
+)
+
 @detector_mcp.tool()
 async def convert_edge_data_to_flow(
     edge_data_file: str,
@@ -155,12 +223,12 @@ async def convert_edge_data_to_flow(
     edge_names: 是否使用边缘名称而不是检测器名称
     """
     
-    if not os.path.exists(edge_data_file):
+    if not cached_exists(edge_data_file):
         if ctx:
             ctx.error(f"边缘数据文件不存在: {edge_data_file}")
         return {"success": False, "message": f"边缘数据文件不存在: {edge_data_file}"}
     
-    if not os.path.exists(detector_file):
+    if not cached_exists(detector_file):
         if ctx:
             ctx.error(f"检测器文件不存在: {detector_file}")
         return {"success": False, "message": f"检测器文件不存在: {detector_file}"}
@@ -171,55 +239,27 @@ async def convert_edge_data_to_flow(
     
     # 确保输出目录存在
     output_dir = os.path.dirname(output_file)
-    if output_dir and not os.path.exists(output_dir):
+    if output_dir:
         os.makedirs(output_dir, exist_ok=True)
     
     # 构建命令
-    cmd = [
-        "python",
-        os.path.join(os.environ.get("SUMO_HOME", ""), "tools", "detector", "flowFromEdgeData.py"),
-        "-e", edge_data_file,
-        "-d", detector_file,
-        "-o", output_file,
-        "--flow-column", flow_column,
-        "--interval", str(interval),
-        "--begin", str(begin_time)
-    ]
-    
-    if end_time is not None:
-        cmd.extend(["--end", str(end_time)])
-    if flow_output_file:
-        cmd.extend(["--flow-output", flow_output_file])
-    if detector_flow_file:
-        cmd.extend(["--detector-flow-file", detector_flow_file])
-    if respect_zero:
-        cmd.append("--respect-zero")
-    if long_names:
-        cmd.append("--long-names")
-    if edge_names:
-        cmd.append("--edge-names")
+    cmd = _build_argv(_FLOW_FROM_EDGE_DATA, _EDGE_DATA_TO_FLOW_SPEC, locals())
     
     if ctx:
         ctx.info(f"执行命令: {' '.join(cmd)}")
     
     try:
-        process = subprocess.run(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            check=False
-        )
+        returncode, stdout, stderr = await run_command(cmd)
         
         result = {
-            "success": process.returncode == 0,
-            "message": "边缘数据转换成功" if process.returncode == 0 else "边缘数据转换失败",
-            "stdout": process.stdout,
-            "stderr": process.stderr,
+            "success": returncode == 0,
+            "message": "边缘数据转换成功" if returncode == 0 else "边缘数据转换失败",
+            "stdout": stdout,
+            "stderr": stderr,
             "command": " ".join(cmd)
         }
         
-        if process.returncode == 0 and os.path.exists(output_file):
+        if returncode == 0 and os.path.exists(output_file):
             result["output_file"] = output_file
             result["file_size"] = os.path.getsize(output_file)
             if flow_output_file and os.path.exists(flow_output_file):
@@ -241,6 +281,20 @@ async def convert_edge_data_to_flow(
 # ────────────────────────────────────────────────────────────────────────────────
 # TOOL 3: 检测器坐标映射
 # ────────────────────────────────────────────────────────────────────────────────
+_MAP_DETECTORS_SPEC = (
+    ("net_file", "-n", "str"),
+    ("detector_file", "-d", "str"),
+    ("output_file", "-o", "str"),
+    ("detector_output_file", "--detector-output", "str"),
+    ("id_column", "--id-column", "str"),
+    ("longitude_column", "--lon-column", "str"),
+    ("latitude_column", "--lat-column", "str"),
+    ("delimiter", "--delimiter", "str"),
+    ("max_radius", "--radius", "num"),
+    ("vehicle_class", "--vclass", "str"),
+    ("interval", "--interval", "num")
+)
+
 @detector_mcp.tool()
 async def map_detector_coordinates(
     net_file: str,
@@ -274,59 +328,39 @@ async def map_detector_coordinates(
     interval: 生成的检测器的聚合时间间隔（秒）
     """
     
-    if not os.path.exists(net_file):
+    if not cached_exists(net_file):
         if ctx:
             ctx.error(f"网络文件不存在: {net_file}")
         return {"success": False, "message": f"网络文件不存在: {net_file}"}
     
-    if not os.path.exists(detector_file):
+    if not cached_exists(detector_file):
         if ctx:
             ctx.error(f"检测器文件不存在: {detector_file}")
         return {"success": False, "message": f"检测器文件不存在: {detector_file}"}
     
     # 确保输出目录存在
     output_dir = os.path.dirname(output_file)
-    if output_dir and not os.path.exists(output_dir):
+    if output_dir:
         os.makedirs(output_dir, exist_ok=True)
     
     # 构建命令
-    cmd = [
-        "python",
-        os.path.join(os.environ.get("SUMO_HOME", ""), "tools", "detector", "mapDetectors.py"),
-        "-n", net_file,
-        "-d", detector_file,
-        "-o", output_file,
-        "--detector-output", detector_output_file,
-        "--id-column", id_column,
-        "--lon-column", longitude_column,
-        "--lat-column", latitude_column,
-        "--delimiter", delimiter,
-        "--radius", str(max_radius),
-        "--vclass", vehicle_class,
-        "--interval", str(interval)
-    ]
+    cmd = _build_argv(_MAP_DETECTORS, _MAP_DETECTORS_SPEC, locals())
     
     if ctx:
         ctx.info(f"执行命令: {' '.join(cmd)}")
     
     try:
-        process = subprocess.run(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            check=False
-        )
+        returncode, stdout, stderr = await run_command(cmd)
         
         result = {
-            "success": process.returncode == 0,
-            "message": "检测器坐标映射成功" if process.returncode == 0 else "检测器坐标映射失败",
-            "stdout": process.stdout,
-            "stderr": process.stderr,
+            "success": returncode == 0,
+            "message": "检测器坐标映射成功" if returncode == 0 else "检测器坐标映射失败",
+            "stdout": stdout,
+            "stderr": stderr,
             "command": " ".join(cmd)
         }
         
-        if process.returncode == 0:
+        if returncode == 0:
             if os.path.exists(output_file):
                 result["output_file"] = output_file
                 result["file_size"] = os.path.getsize(output_file)
@@ -347,33 +381,47 @@ async def map_detector_coordinates(
 # ────────────────────────────────────────────────────────────────────────────────
 # TOOL 4: 流量聚合
 # ────────────────────────────────────────────────────────────────────────────────
-@detector_mcp.tool()
-async def aggregate_flows(
-    flow_files: List[str],
-    output_file: str,
-    detector_file: str = None,
-    flow_column: str = "qPKW",
-    begin_time: int = 0,
-    end_time: int = None,
-    interval: int = 60,
-    ctx: Context = None
-) -> Dict[str, Any]:
-    """基于SUMO的aggregateFlows.py脚本聚合多个流量文件
-    
-    此工具将多个流量文件聚合为单个输出文件，支持时间间隔聚合。
+_AGGREGATE_FLOWS_SPEC = (
+    ("output_file", "-o", "str"),
+    ("flow_column", "--flow-column", "str"),
+    ("begin_time", "--begin", "num"),
+    ("interval", "--interval", "num"),
+    ("flow_files", "-f", "each"),
+    ("detector_file", "-d", "str"),
+    ("end_time", "--end", "num")
+)
+
+class AggregateFlowsJob(BaseModel):
+    """aggregate_flows_batch 中的一个聚合作业，字段与 aggregate_flows 的参数相同"""
+    
+    # 拼错的参数名直接报错，而不是被静默忽略
+    model_config = ConfigDict(extra="forbid")
+    
+    flow_files: List[str]
+    output_file: str
+    detector_file: Optional[str] = None
+    flow_column: str = "qPKW"
+    begin_time: int = 0
+    end_time: Optional[int] = None
+    interval: int = 60
+
+# 除输出文件外决定分组的作业参数：输出文件和这些参数都相同的作业只是输入文件不同
+_AGGREGATE_OPTION_KEYS = ("detector_file", "flow_column", "begin_time", "end_time", "interval")
+
+def _aggregate_group_key(job: AggregateFlowsJob) -> tuple:
+    """作业的分组键 (输出文件绝对路径, 其余参数...)"""
+    return (os.path.abspath(job.output_file),) + tuple(getattr(job, name) for name in _AGGREGATE_OPTION_KEYS)
+
+async def _aggregate_group(job: Dict[str, Any], ctx: Context = None) -> Dict[str, Any]:
+    """以一次 aggregateFlows.py 调用执行一组聚合作业"""
+    flow_files = job["flow_files"]
+    output_file = job["output_file"]
     
-    参数:
-    flow_files: 要聚合的流量文件路径列表
-    output_file: 输出的聚合流量文件路径
-    detector_file: 检测器定义文件路径（可选）
-    flow_column: 要聚合的流量数据列名
-    begin_time: 开始时间（分钟）
-    end_time: 结束时间（分钟），如果为None则处理所有数据
-    interval: 聚合时间间隔（分钟）
-    """
+    if not flow_files:
+        return {"success": False, "message": "未提供要聚合的流量文件"}
     
     # 检查输入文件
-    missing_files = [f for f in flow_files if not os.path.exists(f)]
+    missing_files = [f for f in flow_files if not cached_exists(f)]
     if missing_files:
         if ctx:
             ctx.error(f"以下文件不存在: {missing_files}")
@@ -381,50 +429,28 @@ async def aggregate_flows(
     
     # 确保输出目录存在
     output_dir = os.path.dirname(output_file)
-    if output_dir and not os.path.exists(output_dir):
+    if output_dir:
         os.makedirs(output_dir, exist_ok=True)
     
     # 构建命令
-    cmd = [
-        "python",
-        os.path.join(os.environ.get("SUMO_HOME", ""), "tools", "detector", "aggregateFlows.py"),
-        "-o", output_file,
-        "--flow-column", flow_column,
-        "--begin", str(begin_time),
-        "--interval", str(interval)
-    ]
-    
-    # 添加输入文件
-    for flow_file in flow_files:
-        cmd.extend(["-f", flow_file])
-    
-    if detector_file:
-        cmd.extend(["-d", detector_file])
-    if end_time is not None:
-        cmd.extend(["--end", str(end_time)])
+    cmd = _build_argv(_AGGREGATE_FLOWS, _AGGREGATE_FLOWS_SPEC, job)
     
     if ctx:
         ctx.info(f"执行命令: {' '.join(cmd)}")
     
     try:
-        process = subprocess.run(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            check=False
-        )
+        returncode, stdout, stderr = await run_command(cmd)
         
         result = {
-            "success": process.returncode == 0,
-            "message": "流量聚合成功" if process.returncode == 0 else "流量聚合失败",
-            "stdout": process.stdout,
-            "stderr": process.stderr,
+            "success": returncode == 0,
+            "message": "流量聚合成功" if returncode == 0 else "流量聚合失败",
+            "stdout": stdout,
+            "stderr": stderr,
             "command": " ".join(cmd),
             "input_files_count": len(flow_files)
         }
         
-        if process.returncode == 0 and os.path.exists(output_file):
+        if returncode == 0 and os.path.exists(output_file):
             result["output_file"] = output_file
             result["file_size"] = os.path.getsize(output_file)
         
@@ -439,37 +465,156 @@ async def aggregate_flows(
             "traceback": traceback.format_exc()
         }
 
+async def _aggregate_batch(jobs: List[AggregateFlowsJob], ctx: Context = None) -> List[Dict[str, Any]]:
+    """按 _aggregate_group_key 合并作业，每组只启动一次脚本，各组并行执行
+    
+    调用方需保证每个输出文件只对应一组，否则会有多个脚本同时写同一个文件。
+    同一组中重复出现的流量文件只传入一次，否则其流量会被重复计算。
+    返回每组的结果，其中 job_indices 为该组包含的作业在 jobs 中的下标
+    """
+    groups: Dict[tuple, Dict[str, Any]] = {}
+    for index, job in enumerate(jobs):
+        key = _aggregate_group_key(job)
+        job = job.model_dump()
+        group = groups.get(key)
+        if group is None:
+            groups[key] = group = {**job, "flow_files": {}, "job_indices": []}
+        for flow_file in job["flow_files"]:
+            # 以绝对路径去重，保留首次出现的写法和顺序
+            group["flow_files"].setdefault(os.path.abspath(flow_file), flow_file)
+        group["job_indices"].append(index)
+    
+    for group in groups.values():
+        group["flow_files"] = list(group["flow_files"].values())
+    results = await asyncio.gather(*(_aggregate_group(group, ctx) for group in groups.values()))
+    for group, result in zip(groups.values(), results):
+        result["job_indices"] = group["job_indices"]
+    return results
+
+@detector_mcp.tool()
+async def aggregate_flows(
+    flow_files: List[str],
+    output_file: str,
+    detector_file: str = None,
+    flow_column: str = "qPKW",
+    begin_time: int = 0,
+    end_time: int = None,
+    interval: int = 60,
+    ctx: Context = None
+) -> Dict[str, Any]:
+    """基于SUMO的aggregateFlows.py脚本聚合多个流量文件
+    
+    此工具将多个流量文件聚合为单个输出文件，支持时间间隔聚合。
+    
+    参数:
+    flow_files: 要聚合的流量文件路径列表
+    output_file: 输出的聚合流量文件路径
+    detector_file: 检测器定义文件路径（可选）
+    flow_column: 要聚合的流量数据列名
+    begin_time: 开始时间（分钟）
+    end_time: 结束时间（分钟），如果为None则处理所有数据
+    interval: 聚合时间间隔（分钟）
+    """
+    
+    job = AggregateFlowsJob(
+        flow_files=flow_files,
+        output_file=output_file,
+        detector_file=detector_file,
+        flow_column=flow_column,
+        begin_time=begin_time,
+        end_time=end_time,
+        interval=interval
+    )
+    result = (await _aggregate_batch([job], ctx))[0]
+    result.pop("job_indices")
+    return result
+
+# ────────────────────────────────────────────────────────────────────────────────
+# TOOL 5: 批量流量聚合
+# ────────────────────────────────────────────────────────────────────────────────
+@detector_mcp.tool()
+async def aggregate_flows_batch(
+    jobs: List[AggregateFlowsJob],
+    ctx: Context = None
+) -> Dict[str, Any]:
+    """一次提交多个流量聚合作业，写入同一输出文件的作业合并为一次aggregateFlows.py调用
+    
+    aggregateFlows.py 每次只写一个输出文件，因此输出文件不同的作业不会合并，
+    每个输出文件仍各启动一次脚本（各组并行执行），这种情况下并不减少进程启动次数。
+    只有 output_file、detector_file、flow_column、begin_time、end_time、interval
+    都相同的作业会把各自的 flow_files 合并后只启动一次脚本。
+    同一输出文件对应多组不同参数时拒绝整个批次，避免多个脚本同时写同一个文件。
+    
+    参数:
+    jobs: 作业列表，每个作业的字段与 aggregate_flows 的参数相同（见 AggregateFlowsJob），
+          必须提供 flow_files 和 output_file，其余参数使用 aggregate_flows 的默认值，
+          未知的字段名会被拒绝；同一组中重复的流量文件只聚合一次
+    """
+    
+    # 每个输出文件只能对应一组参数
+    output_keys: Dict[str, tuple] = {}
+    conflicts = []
+    for job in jobs:
+        key = _aggregate_group_key(job)
+        if output_keys.setdefault(key[0], key) != key and key[0] not in conflicts:
+            conflicts.append(key[0])
+    if conflicts:
+        if ctx:
+            ctx.error(f"以下输出文件对应多组不同的聚合参数: {conflicts}")
+        return {
+            "success": False,
+            "message": f"以下输出文件对应多组不同的聚合参数: {conflicts}",
+            "conflicting_outputs": conflicts
+        }
+    
+    results = await _aggregate_batch(jobs, ctx)
+    failed = sum(1 for result in results if not result["success"])
+    
+    return {
+        "success": failed == 0,
+        "message": f"已处理 {len(jobs)} 个作业，合并为 {len(results)} 组，失败 {failed} 组",
+        "jobs_count": len(jobs),
+        "groups_count": len(results),
+        "results": results
+    }
+
 # ────────────────────────────────────────────────────────────────────────────────
 # 检测器资源
 # ────────────────────────────────────────────────────────────────────────────────
+_DETECTOR_CONFIG = {
+    "version": "1.0.0",
+    "name": "SUMO Detector Tools",
+    "description": "SUMO检测器工具包，用于处理交通流量检测、数据转换和分析",
+    "tools": [
+        "convert_flow_to_edge_data",
+        "convert_edge_data_to_flow",
+        "map_detector_coordinates",
+        "aggregate_flows",
+        "aggregate_flows_batch"
+    ],
+    "supported_formats": {
+        "input": ["CSV", "XML"],
+        "output": ["CSV", "XML"]
+    }
+}
+
 @detector_mcp.resource("data://detector/config")
 def get_detector_config() -> Dict[str, Any]:
     """获取检测器工具配置信息"""
-    return {
-        "version": "1.0.0",
-        "name": "SUMO Detector Tools",
-        "description": "SUMO检测器工具包，用于处理交通流量检测、数据转换和分析",
-        "tools": [
-            "convert_flow_to_edge_data",
-            "convert_edge_data_to_flow",
-            "map_detector_coordinates",
-            "aggregate_flows"
-        ],
-        "supported_formats": {
-            "input": ["CSV", "XML"],
-            "output": ["CSV", "XML"]
-        }
-    }
+    return _DETECTOR_CONFIG
+
+_DETECTOR_HELP = {
+    "convert_flow_to_edge_data": "将CSV流量数据转换为SUMO的edgeData XML格式",
+    "convert_edge_data_to_flow": "将SUMO的edgeData XML格式转换为CSV流量数据",
+    "map_detector_coordinates": "通过地图匹配将坐标点映射到SUMO网络中的车道",
+    "aggregate_flows": "聚合多个流量文件为单个输出文件",
+    "aggregate_flows_batch": "批量提交聚合作业，写入同一输出文件且参数相同的作业合并为一次脚本调用"
+}
 
 @detector_mcp.resource("data://detector/help")
 def get_detector_help() -> Dict[str, str]:
     """获取检测器工具帮助信息"""
-    return {
-        "convert_flow_to_edge_data": "将CSV流量数据转换为SUMO的edgeData XML格式",
-        "convert_edge_data_to_flow": "将SUMO的edgeData XML格式转换为CSV流量数据",
-        "map_detector_coordinates": "通过地图匹配将坐标点映射到SUMO网络中的车道",
-        "aggregate_flows": "聚合多个流量文件为单个输出文件"
-    }
+    return _DETECTOR_HELP
 
 # 如果直接运行此文件，启动检测器工具服务器
 if __name__ == "__main__":
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+SUMO工具子模块共用的子进程辅助函数
+在不阻塞事件循环的情况下运行外部程序，并只保留输出的末尾部分
+"""
+
+import asyncio
+import contextlib
+import subprocess
+import sys
+from collections import deque
+from typing import List, Optional, Tuple
+
+# 在Windows上启动SUMO程序和脚本时不弹出控制台窗口
+SUBPROCESS_CREATIONFLAGS = subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
+
+# 每个输出流最多保留的末尾行数，避免大型网络转换的输出占满内存和响应
+OUTPUT_TAIL_LINES = 2000
+
+# 每次从输出流读取的字节数，以及单行最多保留的字节数（超出部分只保留行尾）
+_READ_CHUNK_SIZE = 1 << 16
+_MAX_LINE_BYTES = 1 << 20
+
+async def _drain(stream: Optional[asyncio.StreamReader], buffer: deque) -> None:
+    """分块读取输出流并自行切分行，只保留最后 OUTPUT_TAIL_LINES 行；未捕获的流直接跳过
+    
+    不使用按行读取，因此超长的行不会触发 StreamReader 的长度限制
+    """
+    if stream is None:
+        return
+    partial = b""
+    while True:
+        chunk = await stream.read(_READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        lines = (partial + chunk).split(b"\n")
+        partial = lines.pop()[-_MAX_LINE_BYTES:]
+        buffer.extend(line + b"\n" for line in lines)
+    if partial:
+        buffer.append(partial)
+
+async def run_command(cmd: List[str], capture_stdout: bool = True, capture_stderr: bool = True) -> Tuple[int, str, str]:
+    """在不阻塞事件循环的情况下运行命令，返回 (返回码, stdout末尾, stderr末尾)
+    
+    不捕获的输出流会被丢弃（例如程序已将其写入日志文件），对应的返回值为空字符串。
+    读取输出出错或调用被取消时会结束子进程并等待其退出，不会留下孤儿进程。
+    """
+    process = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE if capture_stdout else asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE if capture_stderr else asyncio.subprocess.DEVNULL,
+        creationflags=SUBPROCESS_CREATIONFLAGS
+    )
+    stdout = deque(maxlen=OUTPUT_TAIL_LINES)
+    stderr = deque(maxlen=OUTPUT_TAIL_LINES)
+    try:
+        await asyncio.gather(_drain(process.stdout, stdout), _drain(process.stderr, stderr))
+        returncode = await process.wait()
+    finally:
+        if process.returncode is None:
+            with contextlib.suppress(ProcessLookupError):
+                process.kill()
+            await process.wait()
+    return returncode, b"".join(stdout).decode("utf-8", "replace"), b"".join(stderr).decode("utf-8", "replace")
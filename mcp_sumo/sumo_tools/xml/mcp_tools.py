@@ -288,7 +288,9 @@ async def convert_xml_to_csv(
                 }
             
             # 统计CSV文件的行数和列数
+            # 无法统计的文件汇总后一次性发出警告
             statistics = {}
+            warning_messages = []
             for file in output_files:
                 try:
                     with open(file, 'r', encoding='utf-8') as f:
@@ -302,8 +304,10 @@ async def convert_xml_to_csv(
                                 "column_count": col_count
                             }
                 except Exception as e:
-                    if ctx:
-                        ctx.warning(f"无法统计CSV文件 {file} 的行列数: {str(e)}")
+                    warning_messages.append(f"无法统计CSV文件 {file} 的行列数: {str(e)}")
+            
+            if ctx and warning_messages:
+                ctx.warning("\n".join(warning_messages))
             
             return {
                 "success": True,
@@ -1,26 +1,36 @@
-﻿import xml.etree.ElementTree as ET
+﻿import os
+import xml.etree.ElementTree as ET
 
 def separate_traffic_lights(net_xml_path, tls_xml_path, program_id='a'):
-    # 解析原始的net.xml文件
-    tree = ET.parse(net_xml_path)
-    root = tree.getroot()
+    # 逐个读取net.xml中的元素，避免把整个路网加载到内存中
+    context = ET.iterparse(net_xml_path, events=('start', 'end'))
+    _, root = next(context)
+    depth = 1
 
-    # 创建一个新的XML根元素，用于存储信号灯信息
-    traffic_light_root = ET.Element('additional')
+    # 先写入临时文件再替换，tls_xml_path 可能是与其他运行目录共享的硬链接，直接覆盖会改写它们
+    tmp_path = tls_xml_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        # 创建一个新的XML根元素，用于存储信号灯信息
+        f.write("<?xml version='1.0' encoding='utf-8'?>\n<additional>")
 
-    # 查找所有的tlLogic元素
-    tlLogic_elements = root.findall('.//tlLogic')
+        for event, elem in context:
+            if event == 'start':
+                depth += 1
+                continue
+            depth -= 1
+            if depth != 1:
+                continue
 
-    # 将tlLogic元素从原始XML中移除，并添加到新的XML中
-    for tlLogic in tlLogic_elements:
-        # add文件的programID需要与net的不一样
-        tlLogic.set('programID', program_id)
-        root.remove(tlLogic)
-        traffic_light_root.append(tlLogic)
+            # 将顶层的tlLogic元素写入新的XML中
+            if elem.tag == 'tlLogic':
+                # add文件的programID需要与net的不一样
+                elem.set('programID', program_id)
+                f.write(ET.tostring(elem, encoding='unicode'))
 
-    # 创建新的XML树
-    traffic_light_tree = ET.ElementTree(traffic_light_root)
+            # 已处理完的顶层元素不再需要，释放内存
+            root.clear()
 
-    # 保存只有信号灯的XML文件
-    traffic_light_tree.write(tls_xml_path, encoding='utf-8', xml_declaration=True)
+        # 保存只有信号灯的XML文件
+        f.write("</additional>")
 
+    os.replace(tmp_path, tls_xml_path)